@@ -1,14 +1,15 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from st_flexible_callout_elements import flexible_callout
-from supabase import create_client
 from pricing.option_pricing import EuropeanOption
+from pricing.mc_jobs import MonteCarloJob
+from pricing.mc_cache import MonteCarloCache
+from pricing.path_dependent import BARRIER_PAYOFFS
 from pricing.stocks_options import *
-from plotting.black_scholes import plot_payoffs, create_greek_graph
-from plotting.monte_carlo import plot_gbm_paths, plot_confidence_interval
-from plotting.candlestick import plot_candlestick_asset
 from src.utils import *
-from config import AppSettings, Colors, Supabase, Greeks, VariableKey, StreamlitInputs, OptionType, TRADING_YEAR_DAYS
+from src.profiling import profiled, start_rerun, finish_rerun
+from config import AppSettings, Colors, Supabase, Greeks, VariableKey, StreamlitInputs, OptionType, PayoffType, ExerciseType, TRADING_YEAR_DAYS
 
 def get_user_inputs(key_prefix, config, selected_inputs = None):
 
@@ -75,7 +76,11 @@ def render_bs_greek_inputs():
 
     return selected_greek, selected_variable
 
+@st.fragment # the toggles and the greek selection only rerun this subtab
+@profiled(fragment=True)
 def stage_bs_subtab(input_parameters, config, color_config):
+    # the plotting modules (plotly, scipy) are imported with the first section that draws, not before the first paint
+    from plotting.black_scholes import plot_payoffs, create_greek_graph
 
     (   _,
         plot_column,
@@ -133,32 +138,64 @@ def stage_bs_subtab(input_parameters, config, color_config):
 
 
 
-def cache_mc_results(input_parameters, config, color_config):
+@profiled()
+def cache_mc_results(job):
+    progress = job.progress()
+
+    # only numbers and a float32 sample of the plotted paths are kept per session, the figures are rebuilt
+    # from them on every render (the job and its simulation can be dropped, the shared cache still has them)
+    st.session_state["modelling_result"] = {
+        "price": float(progress["price"]),
+        "confidence_interval": [float(bound) for bound in progress["confidence_interval"]],
+        "paths": progress["paths"],
+        "sample_paths": job.sample_paths.astype(np.float32),
+        "T": float(job.option.T),
+        "r": float(job.option.r),
+        "seed": job.seed,
+        "barrier": job.barrier
+    }
+    del st.session_state["mc_job"]
+
+@st.cache_resource
+def get_mc_cache(config):
+    # one cache for all the sessions, two users with the same inputs and seed simulate only once
+    return MonteCarloCache(max_bytes=config.MC_CACHE_BYTES,
+                           spill_path=config.MC_CACHE_SPILL_PATH,
+                           max_disk_bytes=config.MC_CACHE_DISK_BYTES
+                           )
+
+def start_mc_job(input_parameters, config):
+    from plotting.monte_carlo import sample_path_indices
+
     input_parameters = input_parameters.copy()
     mc_parameters_list = [VariableKey.PATHS.value, VariableKey.STEPS.value, "seed"]
     mc_parameters = {k: input_parameters.pop(k) for k in mc_parameters_list}
+    product = input_parameters.pop(VariableKey.PAYOFF.value)
+    barrier = input_parameters.pop(VariableKey.BARRIER.value)
+
+    # the previous simulation is stale as soon as the inputs change, it stops within one batch
+    if (previous_job := st.session_state.get("mc_job")) is not None:
+        previous_job.cancel()
+    st.session_state.pop("modelling_result", None)
+
+    job = MonteCarloJob(option=EuropeanOption(**input_parameters),
+                        batch_size=config.MC_BATCH_PATHS,
+                        # only the paths that are plotted are kept
+                        sample_indices=sample_path_indices(n_paths=int(mc_parameters[VariableKey.PATHS.value]),
+                                                           seed=mc_parameters["seed"],
+                                                           config=config
+                                                           ),
+                        cache=get_mc_cache(config),
+                        product=product,
+                        barrier=barrier,
+                        **mc_parameters
+                        )
+    st.session_state["mc_job"] = job.start()
 
-    mc_option = EuropeanOption(**input_parameters)
-    output_mc_dict = mc_option.mc_model(**mc_parameters)
-    modelled_price_mc = output_mc_dict["price"]
-    confidence_interval = output_mc_dict["confidence_interval"]
-
-    gbm_plot, end_points_plot = plot_gbm_paths(S_paths=mc_option.mc_generate_paths(**mc_parameters),
-                                               T=input_parameters[VariableKey.T.value],
-                                               r=input_parameters[VariableKey.R.value],
-                                               seed=mc_parameters["seed"],
-                                               config=config,
-                                               color_config=color_config
-                                               )
+    # short simulations are done right away and are shown without any progressive updates
+    job.wait(timeout=config.MC_PROGRESS_INTERVAL)
 
-    st.session_state["modelling_result"] = {
-        "modelled_price": modelled_price_mc,
-        "confidence_interval": confidence_interval,
-        "gbm_plot": gbm_plot,
-        "end_points_plot": end_points_plot
-    }
-
-def refresh_mc_if_inputs_changed(input_parameters, fixed_seed_toggle, position_column, config, color_config):
+def refresh_mc_if_inputs_changed(input_parameters, fixed_seed_toggle, position_column, config):
 
     # initialize for the first time
     if "last_inputs" not in st.session_state:
@@ -186,7 +223,7 @@ def refresh_mc_if_inputs_changed(input_parameters, fixed_seed_toggle, position_c
     
     if st.session_state["last_inputs"] != input_parameters or st.session_state["last_seed"] != seed:
         input_parameters["seed"] = seed
-        cache_mc_results(input_parameters=input_parameters, config=config, color_config=color_config)
+        start_mc_job(input_parameters=input_parameters, config=config)
     else:
         input_parameters["seed"] = seed
 
@@ -194,6 +231,8 @@ def refresh_mc_if_inputs_changed(input_parameters, fixed_seed_toggle, position_c
     st.session_state["last_inputs"] = input_parameters
 
 def render_ci_plot(modelled_price_mc, confidence_interval, option_type, container, color_config):
+    from plotting.monte_carlo import plot_confidence_interval
+
     if modelled_price_mc >= 0.01:
         CI_plot = plot_confidence_interval(modelled_price_mc, confidence_interval, option_type, color_config)
         container.plotly_chart(CI_plot, 
@@ -217,83 +256,195 @@ def render_mc_input(config):
     
     return num_paths, num_steps
 
-def stage_mc_subtab(input_parameters, config, color_config):
+def render_mc_payoff_input(config):
+    (_, input_left, _, input_right, _) = st.columns([0.25, 1.5, 0.1, 1.5, 0.25])
+    with input_left:
+        product = st.selectbox("Payoff", [payoff.value for payoff in PayoffType])
+    with input_right:
+        barrier = (streamlit_input_ui(variable=VariableKey.BARRIER.value, config=config)
+                   if product in BARRIER_PAYOFFS else None)
+
+    return product, barrier
+
+@profiled(fragment=True)
+def render_mc_results(option_type, config, color_config):
+    from plotting.monte_carlo import plot_gbm_paths
+    from plotting.utils_plotting import dashed_line
+
+    if "mc_job" in st.session_state and st.session_state["mc_job"].finished:
+        cache_mc_results(job=st.session_state["mc_job"])
+    running = "mc_job" in st.session_state
+    result = st.session_state["mc_job"].progress() if running else st.session_state["modelling_result"]
+
     (
         _,
         plot_column, 
         _, 
-        seed_endpoints_column, 
+        end_points_column, 
         _
     ) = uniform_columns([1.5, 0.5])
 
-    mc_parameters = input_parameters.copy()
+    if not running:
+        gbm_plot, end_points_plot = plot_gbm_paths(S_paths=result["sample_paths"],
+                                                   T=result["T"],
+                                                   r=result["r"],
+                                                   seed=result["seed"],
+                                                   config=config,
+                                                   color_config=color_config
+                                                   )
+        if result["barrier"] is not None:
+            dashed_line(gbm_plot, [0, result["T"]], [result["barrier"]], opacity=0.5)
 
-    # get the mc-specific inputs along with initializing containers for the plot and output
     with plot_column:
         st.caption("Monte Carlo option price")
+        render_output_price_bubble(option_type=option_type, 
+                                   modelled_price=result["price"],
+                                   config=config,
+                                   color_config=color_config
+                                   )
 
-        modelled_price_container = st.empty()
-        main_gbm_plot_container = st.empty()
-        under_plot_caption_container = st.empty()
+        if running:
+            st.progress(result["paths_done"] / result["paths"],
+                        text=f"Simulated {result['paths_done']:,} of {result['paths']:,} paths"
+                        )
+        else:
+            st.plotly_chart(gbm_plot,
+                            use_container_width=True,
+                            config={"displayModeBar": False}
+                            )
+            if result["paths"] > config.MAX_GBM_LINES:
+                st.caption(f"Due to performance concerns this plot only shows {config.MAX_GBM_LINES} randomly chosen paths.")
+
+    with end_points_column:
+        upper_padding(1)
+        render_ci_plot(modelled_price_mc=result["price"],
+                       confidence_interval=result["confidence_interval"],
+                       option_type=option_type,
+                       container=st.empty(),
+                       color_config=color_config
+                       )
+
+        if not running:
+            st.plotly_chart(end_points_plot,
+                            use_container_width=False, 
+                            config={"displayModeBar": False}
+                            )
+
+    # the last progressive update reruns the app once, which draws the results again without the polling
+    if not running and st.session_state.get("mc_polling"):
+        st.session_state["mc_polling"] = False
+        st.rerun()
+
+@st.fragment # the paths, steps and seed inputs only rerun this subtab
+@profiled(fragment=True)
+def stage_mc_subtab(input_parameters, config, color_config):
+    mc_parameters = input_parameters.copy()
+
+    # the results are drawn above the inputs they depend on
+    results_container = st.container()
+    (
+        _,
+        input_column, 
+        _, 
+        seed_column, 
+        _
+    ) = uniform_columns([1.5, 0.5])
 
+    with input_column:
         num_paths, num_steps = render_mc_input(config=config)
+        product, barrier = render_mc_payoff_input(config=config)
         mc_parameters.update({
             VariableKey.PATHS.value: num_paths,
             VariableKey.STEPS.value: num_steps, 
+            VariableKey.PAYOFF.value: product,
+            VariableKey.BARRIER.value: barrier
         })
 
-    # initialize the last column where ci-interval, endpoints and seed toggle lies
-    with seed_endpoints_column:
-        upper_padding(1)
-        confidence_interval_container = st.empty()
-        end_points_container = st.empty()
+    with seed_column:
         fixed_seed_toggle = st.toggle("Fixed seed", value=False)
 
     refresh_mc_if_inputs_changed(input_parameters=mc_parameters,
                                  fixed_seed_toggle=fixed_seed_toggle,
-                                 position_column=seed_endpoints_column,
-                                 config=config,
-                                 color_config=color_config
+                                 position_column=seed_column,
+                                 config=config
                                  )
 
-    modelling_result = st.session_state["modelling_result"]
-    modelled_price_mc = modelling_result["modelled_price"]
-    confidence_interval = modelling_result["confidence_interval"]
-    gbm_plot = modelling_result["gbm_plot"]
-    end_points_plot = modelling_result["end_points_plot"]
+    # while the simulation runs in the background, its results are redrawn every MC_PROGRESS_INTERVAL seconds
+    polling = "mc_job" in st.session_state and not st.session_state["mc_job"].finished
+    st.session_state["mc_polling"] = polling
+    with results_container:
+        st.fragment(render_mc_results, run_every=config.MC_PROGRESS_INTERVAL if polling else None)(
+            option_type=mc_parameters[VariableKey.OPTION_TYPE.value],
+            config=config,
+            color_config=color_config
+        )
 
-    with modelled_price_container:
-        render_output_price_bubble(option_type=mc_parameters[VariableKey.OPTION_TYPE.value], 
-                                    modelled_price=modelled_price_mc,
-                                    config=config,
-                                    color_config=color_config
-                                    )
 
-        main_gbm_plot_container.plotly_chart(
-            gbm_plot,
-            use_container_width=True,
-            config={"displayModeBar": False}
-        )
 
-        if mc_parameters[VariableKey.PATHS.value] > config.MAX_GBM_LINES:
-            under_plot_caption_container.caption(
-                f"Due to performance concerns this plot only shows {config.MAX_GBM_LINES} randomly chosen paths."
-            )
+def render_lattice_input(config):
+    (_, steps_column, _, exercise_column, _, tree_column, _) = st.columns([0.25, 1, 0.1, 1, 0.1, 1, 0.25])
+    with steps_column:
+        steps = streamlit_input_ui(variable=VariableKey.TREE_STEPS.value, config=config)
+    # a segmented control can be deselected, its default is used then
+    with exercise_column:
+        exercise = (streamlit_input_ui(variable=VariableKey.EXERCISE.value, config=config)
+                    or config.STREAMLIT_INPUT_CONFIGS[VariableKey.EXERCISE.value].default)
+    with tree_column:
+        tree = (streamlit_input_ui(variable=VariableKey.TREE.value, config=config)
+                or config.STREAMLIT_INPUT_CONFIGS[VariableKey.TREE.value].default)
 
-    with seed_endpoints_column:
-        render_ci_plot(modelled_price_mc=modelled_price_mc,
-                       confidence_interval=confidence_interval,
-                       option_type=mc_parameters[VariableKey.OPTION_TYPE.value],
-                       container=confidence_interval_container,
-                       color_config=color_config
-                       )
+    return int(steps), exercise, tree
 
-        end_points_container.plotly_chart(end_points_plot,
-                                          use_container_width=False, 
-                                          config={"displayModeBar": False}
-                                          )
+@st.fragment # the tree inputs only rerun this subtab
+@profiled(fragment=True)
+def stage_lattice_subtab(input_parameters, config, color_config):
+    from plotting.lattice import plot_lattice_convergence
 
+    (
+        _,
+        plot_column,
+        _,
+        comparison_column,
+        _
+    ) = uniform_columns([1.5, 0.5])
+
+    with plot_column:
+        st.caption("Binomial/trinomial tree option price")
+        modelled_price_container = st.empty()
+        convergence_plot_container = st.empty()
+        steps, exercise, tree = render_lattice_input(config=config)
 
+    option_class = EuropeanOption(**input_parameters)
+    price_lattice = option_class.lattice_model(steps=steps, exercise=exercise, tree=tree)["price"]
+    price_bs = option_class.bs_price()
+
+    with modelled_price_container:
+        render_output_price_bubble(option_type=input_parameters[VariableKey.OPTION_TYPE.value],
+                                   modelled_price=price_lattice,
+                                   config=config,
+                                   color_config=color_config
+                                   )
+
+    convergence_plot = plot_lattice_convergence(input_parameters=input_parameters,
+                                                steps=steps,
+                                                exercise=exercise,
+                                                tree=tree,
+                                                color_config=color_config
+                                                )
+    convergence_plot_container.plotly_chart(convergence_plot, use_container_width=True, config={"displayModeBar": False})
+
+    with comparison_column:
+        upper_padding(10)
+        st.write("Comparison with Black-Scholes")
+        # for European exercise the difference is the discretization error of the tree, not a premium
+        difference_label = ("Early exercise premium" if exercise == ExerciseType.AMERICAN.value
+                            else "Lattice - Black-Scholes")
+        comparison = pd.DataFrame({
+            "Black-Scholes (European)": [price_bs],
+            f"{tree} tree ({exercise})": [price_lattice],
+            difference_label: [price_lattice - price_bs]
+        }, index=["Values"])
+        st.table(comparison.transpose())
 
 def render_change_bubble(df, container, color_config, font_size = 20, padding = 10):
     try:
@@ -321,7 +472,14 @@ def render_change_bubble(df, container, color_config, font_size = 20, padding =
                      container=container
                      )
 
-def render_candlestick_plot(key_prefix, config, color_config, supabase_client):
+def flag_ticker_change():
+    st.session_state["ticker_changed"] = True
+
+@st.fragment # the interval selection only reruns the candlestick panel
+@profiled(fragment=True)
+def render_candlestick_plot(key_prefix, config, color_config, supabase_client, snapshot_index=None):
+    from plotting.candlestick import plot_candlestick_asset
+
     upper_padding(10)
     (
         _,
@@ -330,10 +488,18 @@ def render_candlestick_plot(key_prefix, config, color_config, supabase_client):
         change_column,
         _
     ) = uniform_columns(non_empty_column_sizes=[2,1.5], empty_padding_size=0.5)
-    tickers = get_tickers(_supabase_client=supabase_client)
+    if snapshot_index is not None:
+        tickers = snapshot_index.tickers
+    else:
+        tickers = get_tickers(_supabase_client=supabase_client)
 
     with multiselect_column:
-        selected_ticker = st.selectbox("Select an asset:", tickers)
+        selected_ticker = st.selectbox("Select an asset:", tickers, key=f"{key_prefix}_ticker", on_change=flag_ticker_change)
+
+    # the option pricing panel depends on the ticker, so a new ticker reruns the whole app instead of only this fragment
+    st.session_state["selected_ticker"] = selected_ticker
+    if st.session_state.pop("ticker_changed", False):
+        st.rerun()
 
     with change_column:
         upper_padding(22)
@@ -363,9 +529,6 @@ def render_candlestick_plot(key_prefix, config, color_config, supabase_client):
         main_plot_container.plotly_chart(candlestick_plot)
         render_change_bubble(df=stock_data, container=change_bubble_container, color_config=color_config)
         st.caption(f"*Relative price change in the last {interval_to_text(selected_interval, config)}")
-        end_price = stock_data.iloc[-1]["Close"]
-
-    return selected_ticker, end_price if selected_ticker else None
 
 def render_option_selection_input(df):
     selection = df.index
@@ -390,21 +553,32 @@ def render_price_bubble(price, option_type, config, color_config, font_size = 18
                                 padding=padding
                                 )
 
-def initialize_hv_option_class(options_data, selected_option, closest_expiry, option_type, config):
-    selected_strike_price = options_data.loc[selected_option, "Strike price (K)"]
-    hist_volatility = calculate_historical_volatility(selected_ticker=selected_ticker, config=config)
-    days_until_expiry = (datetime.strptime(closest_expiry, "%d.%m.%Y") - datetime.now()).days / TRADING_YEAR_DAYS
+def get_model_inputs(raw_options_data, selected_ticker, closest_expiry, closing_price, config):
+    # everything except the strike and option type is shared by the whole chain
+    hist_volatility = get_historical_volatility(raw_options_data=raw_options_data,
+                                                selected_ticker=selected_ticker,
+                                                config=config
+                                                )
+    # from the snapshot date, the date of the quotes in the table (and of the model columns stored with them)
+    snapshot_date = datetime.strptime(raw_options_data["snapshot_date"].iloc[0], "%Y-%m-%d")
+    days_until_expiry = (datetime.strptime(closest_expiry, "%d.%m.%Y") - snapshot_date).days / TRADING_YEAR_DAYS
     risk_free_rate = get_risk_free_rate()
-    hv_option = EuropeanOption(S=closing_price, 
-                            K=selected_strike_price,
-                            T=days_until_expiry,
-                            r=risk_free_rate,
-                            sigma=hist_volatility,
-                            option_type=option_type
-                            )
+    return {
+        VariableKey.S.value: closing_price,
+        VariableKey.T.value: days_until_expiry,
+        VariableKey.R.value: risk_free_rate,
+        VariableKey.SIGMA.value: hist_volatility
+    }
+
+def initialize_hv_option_class(options_data, selected_option, option_type, model_inputs):
+    selected_strike_price = options_data.loc[selected_option, "Strike price (K)"]
+    hv_option = EuropeanOption(K=selected_strike_price,
+                               option_type=option_type,
+                               **model_inputs
+                               )
     return hv_option
 
-def render_modelled_prices(option_class, option_type, config, color_config):   
+def render_modelled_prices(option_class, mc_price, option_type, config, color_config):   
     st.write("Price calculated using Black-Scholes")
     render_price_bubble(price=option_class.bs_price(),
                         option_type=option_type,
@@ -415,17 +589,16 @@ def render_modelled_prices(option_class, option_type, config, color_config):
     
     upper_padding(10)
     st.write("Price calculated using Monte Carlo")
-    render_price_bubble(price=option_class.mc_model(paths=10000.0,
-                                                 steps=100,
-                                                 seed=get_seed(seed_interval=config.SEED_INTERVAL),
-                                                 include_ci=False)["price"],
+    render_price_bubble(price=mc_price,
                         option_type=option_type,
                         config=config,
                         color_config=color_config,
                         flexible_colors=False
                         )
 
-def stage_option_pricing(key_prefix, selected_ticker, config, color_config, supabase_client, closing_price):
+@st.fragment # the option type and the option selection only rerun the option pricing panel
+@profiled(fragment=True)
+def stage_option_pricing(key_prefix, selected_ticker, config, color_config, supabase_client, snapshot_index=None):
     if selected_ticker:
         upper_padding(10)
         title_container = st.empty()
@@ -440,7 +613,10 @@ def stage_option_pricing(key_prefix, selected_ticker, config, color_config, supa
             _,
         ) = uniform_columns(non_empty_column_sizes=[0.75, 1.5, 1.5], empty_padding_size=0.25)
 
-        raw_options_data = get_data_from_supabase(supabase_client=supabase_client, selected_ticker=selected_ticker)
+        raw_options_data = get_data_from_supabase(supabase_client=supabase_client,
+                                                  selected_ticker=selected_ticker,
+                                                  snapshot_index=snapshot_index
+                                                  )
         
         if data_input_date := data_older_than_yesterday(df=raw_options_data):
             old_data_text = f" (due to non-trading days, the data is from {data_input_date})"
@@ -452,7 +628,11 @@ def stage_option_pricing(key_prefix, selected_ticker, config, color_config, supa
                                              config=config,
                                              key=key_prefix
                                              )
-        options_data, closest_expiry = get_specific_data(df=raw_options_data, option_type=option_type)
+        options_data, closest_expiry = get_specific_data(df=raw_options_data,
+                                                         option_type=option_type,
+                                                         snapshot_index=snapshot_index,
+                                                         selected_ticker=selected_ticker
+                                                         )
         
         with option_selection_column:
             selected_option = render_option_selection_input(df=options_data)
@@ -465,16 +645,56 @@ def stage_option_pricing(key_prefix, selected_ticker, config, color_config, supa
                                 config=config, 
                                 color_config=color_config
                                 )
+
+        model_inputs = get_model_inputs(raw_options_data=raw_options_data,
+                                        selected_ticker=selected_ticker,
+                                        closest_expiry=closest_expiry,
+                                        closing_price=get_underlying_price(raw_options_data=raw_options_data,
+                                                                           selected_ticker=selected_ticker,
+                                                                           config=config
+                                                                           ),
+                                        config=config
+                                        )
+        # the Black-Scholes columns priced at ingest are read as they are, the chain is only repriced when the
+        # model inputs differ from the ingest ones (or the snapshot doesn't have them)
+        chain_model_prices = get_stored_chain_model_prices(raw_options_data=raw_options_data,
+                                                           options_data=options_data,
+                                                           option_type=option_type,
+                                                           model_inputs=model_inputs
+                                                           )
+        if chain_model_prices is None:
+            chain_model_prices = get_chain_model_prices(_options_data=options_data,
+                                                        selected_ticker=selected_ticker,
+                                                        option_type=option_type,
+                                                        snapshot_date=raw_options_data["snapshot_date"].iloc[0],
+                                                        model_inputs=model_inputs
+                                                        )
+        chain_mc_prices = get_chain_mc_prices(_options_data=options_data,
+                                              selected_ticker=selected_ticker,
+                                              option_type=option_type,
+                                              snapshot_date=raw_options_data["snapshot_date"].iloc[0],
+                                              model_inputs=model_inputs,
+                                              config=config
+                                              )
+        options_table = options_data.join(chain_model_prices).join(chain_mc_prices)
             
-        title_container.write(f"Option market prices for `{selected_ticker}` with expiry at {closest_expiry}" + old_data_text + ":")
-        table_container.dataframe(options_data.style
+        # the models use the last daily close of the snapshot, not the close of the interval shown in the chart
+        underlying_text = f", modelled with the last daily close S = {model_inputs[VariableKey.S.value]:.2f}"
+        title_container.write(f"Option market prices for `{selected_ticker}` with expiry at {closest_expiry}" + old_data_text
+                              + underlying_text + ":")
+        table_container.dataframe(options_table.style
                                   .apply(highlight_chosen_row, target_index=[selected_option], option_type=option_type, axis=None)
                                   .format({"Strike price (K)": "{:.2f}", 
                                            "Bid": "{:.2f}", 
                                            "Ask": "{:.2f}", 
                                            "Volume": "{:.0f}", 
-                                           "Implied volatility (IV)": "{:.4f}"}
-                                           ),
+                                           "Implied volatility (IV)": "{:.4f}",
+                                           **{column: "{:.4f}" for column in chain_model_prices.columns},
+                                           "Model price (BS)": "{:.2f}",
+                                           "Model price (MC)": "{:.2f}",
+                                           "Model - market": "{:+.2f}"},
+                                          na_rep="-"
+                                          ),
                                   height=247
                                   )
         
@@ -488,14 +708,14 @@ def stage_option_pricing(key_prefix, selected_ticker, config, color_config, supa
 
         hv_option = initialize_hv_option_class(options_data=options_data,
                                                selected_option=selected_option,
-                                               closest_expiry=closest_expiry,
                                                option_type=option_type,
-                                               config=config
+                                               model_inputs=model_inputs
                                                )
 
         with bs_model:
             upper_padding(50)
             render_modelled_prices(option_class=hv_option,
+                                   mc_price=chain_mc_prices.loc[selected_option],
                                    option_type=option_type,
                                    config=config,
                                    color_config=color_config
@@ -513,8 +733,7 @@ def stage_option_pricing(key_prefix, selected_ticker, config, color_config, supa
         
 
 if __name__ == "__main__":
-    supabase = create_client(Supabase.SUPABASE_URL, Supabase.SUPABASE_READ_KEY)
-
+    start_rerun(config=AppSettings)
     st.set_page_config(page_title="Option Pricing App", layout="wide")
     tab_2, tab_3 = st.tabs(["Option Pricing", "Option Pricing in Practice"])
 
@@ -542,15 +761,24 @@ if __name__ == "__main__":
                                            )
 
         with output_column:
-            bs_tab, mc_tab = st.tabs(["Black-Scholes Option Pricing", "Monte Carlo Option Pricing"])
+            bs_tab, mc_tab, lattice_tab = st.tabs(["Black-Scholes Option Pricing",
+                                                   "Monte Carlo Option Pricing",
+                                                   "Tree Option Pricing"
+                                                   ])
 
             with bs_tab:
                 stage_bs_subtab(fixed_inputs, config=AppSettings, color_config=Colors)
 
             with mc_tab:
                 stage_mc_subtab(fixed_inputs, config=AppSettings, color_config=Colors)
+
+            with lattice_tab:
+                stage_lattice_subtab(fixed_inputs, config=AppSettings, color_config=Colors)
                 
     with tab_3:
+        supabase = get_supabase_client(supabase_config=Supabase)
+        snapshot_index = get_snapshot_index(_supabase_client=supabase, config=AppSettings) if AppSettings.PRELOAD_SNAPSHOT else None
+
         (
             _,
             candlestick_plot_column,
@@ -560,20 +788,26 @@ if __name__ == "__main__":
         ) = uniform_columns(non_empty_column_sizes=[2,3])
 
         with candlestick_plot_column:
-            selected_ticker, closing_price = render_candlestick_plot(key_prefix="tab_3_1", 
-                                                                     config=AppSettings, 
-                                                                     color_config=Colors,
-                                                                     supabase_client=supabase
-                                                                     )
+            render_candlestick_plot(key_prefix="tab_3_1",
+                                    config=AppSettings,
+                                    color_config=Colors,
+                                    supabase_client=supabase,
+                                    snapshot_index=snapshot_index
+                                    )
 
         with modelling_data_column:
             stage_option_pricing(key_prefix="tab_3_2", 
                                  config=AppSettings,
                                  color_config=Colors, 
-                                 selected_ticker=selected_ticker,
+                                 selected_ticker=st.session_state.get("selected_ticker"),
                                  supabase_client=supabase,
-                                 closing_price=closing_price
+                                 snapshot_index=snapshot_index
                                  )
 
     remove_bottom_padding()
+    if AppSettings.PROFILING and AppSettings.PROFILING_PANEL:
+        st.sidebar.write("Monte Carlo cache")
+        st.sidebar.json(get_mc_cache(AppSettings).metrics(), expanded=False)
+
+    finish_rerun(config=AppSettings)
 
@@ -0,0 +1,52 @@
+# asv benchmarks of the nightly ingest on synthetic yfinance chains, see asv.conf.json
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from supabase_updater.fetch_and_update import fetch_option_data
+
+OptionChain = namedtuple("OptionChain", ["calls", "puts", "underlying"])
+
+def synthetic_yfinance_chain(ticker, expiry, strikes, seed=0):
+    # the columns (and the missing values) of yf.Ticker.option_chain
+    rng = np.random.default_rng(seed)
+    strike_prices = np.round(np.linspace(50, 150, strikes), 1)
+
+    def side(letter):
+        bid = rng.uniform(0, 20, strikes)
+        missing = rng.random(strikes) < 0.1
+        return pd.DataFrame({
+            "contractSymbol": [f"{ticker}{expiry.replace('-', '')[2:]}{letter}{int(K * 1000):08d}" for K in strike_prices],
+            "lastTradeDate": pd.Timestamp("2026-10-16 20:00", tz="UTC"),
+            "strike": strike_prices,
+            "lastPrice": bid + 0.05,
+            "bid": np.where(missing, np.nan, bid),
+            "ask": np.where(missing, np.nan, bid + 0.1),
+            "change": 0.0,
+            "percentChange": 0.0,
+            "volume": np.where(missing, np.nan, rng.integers(0, 5000, strikes)),
+            "openInterest": rng.integers(0, 20000, strikes),
+            "impliedVolatility": rng.uniform(0.1, 0.8, strikes),
+            "inTheMoney": strike_prices < 100,
+            "contractSize": "REGULAR",
+            "currency": "USD"
+        })
+
+    return OptionChain(calls=side("C"), puts=side("P"), underlying={})
+
+class SyntheticTicker:
+    def __init__(self, ticker, strikes):
+        self.ticker = ticker
+        self.strikes = strikes
+
+    def option_chain(self, expiry):
+        return synthetic_yfinance_chain(self.ticker, expiry, self.strikes)
+
+class FetchOptionData:
+    params = [20, 100, 400]
+    param_names = ["strikes"]
+
+    def setup(self, strikes):
+        self.yf_ticker = SyntheticTicker("SYNT", strikes)
+
+    def time_fetch_option_data(self, strikes):
+        fetch_option_data(self.yf_ticker, "SYNT", "2026-11-20")
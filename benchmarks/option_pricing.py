@@ -0,0 +1,215 @@
+# asv benchmarks of the pricing models, see asv.conf.json
+import numpy as np
+from pricing.option_pricing import EuropeanOption
+from pricing.mc_jobs import MonteCarloJob
+from pricing.mc_cache import MonteCarloCache
+from pricing.heston import HestonParameters
+from pricing.fourier import MODELS, fourier_prices
+from pricing.portfolio import Portfolio
+from config import OptionType, ExerciseType, LatticeType, PayoffType, FourierModel
+
+def random_options(n, seed=0):
+    # a single option is priced with scalars, like in the app
+    if n == 1:
+        return EuropeanOption(S=100.0, K=105.0, T=0.5, r=0.04, sigma=0.25, option_type=OptionType.CALL.value)
+
+    rng = np.random.default_rng(seed)
+    return EuropeanOption(S=rng.uniform(50, 150, n),
+                          K=rng.uniform(50, 150, n),
+                          T=rng.uniform(0.05, 2, n),
+                          r=0.04,
+                          sigma=rng.uniform(0.1, 0.6, n),
+                          option_type=rng.choice([OptionType.CALL.value, OptionType.PUT.value], n)
+                          )
+
+class BlackScholes:
+    params = [1, 1_000, 100_000, 1_000_000]
+    param_names = ["options"]
+
+    def setup(self, n):
+        self.option = random_options(n)
+
+    def time_bs_price(self, n):
+        self.option.bs_price()
+
+    def time_bs_greeks(self, n):
+        self.option.bs_greeks()
+
+    def time_bs_delta(self, n):
+        self.option.bs_greeks(greek_to_return="Delta")
+
+class MonteCarlo:
+    params = ([1_000, 10_000, 50_000], [10, 100, 250])
+    param_names = ["paths", "steps"]
+
+    def setup(self, paths, steps):
+        self.option = random_options(1)
+
+    def time_mc_model(self, paths, steps):
+        self.option.mc_model(paths=paths, steps=steps, seed=1)
+
+    def peakmem_mc_model(self, paths, steps):
+        self.option.mc_model(paths=paths, steps=steps, seed=1)
+
+    def time_mc_model_greeks(self, paths, steps):
+        # against time_mc_model, the greeks only add reductions over the same paths
+        self.option.mc_model(paths=paths, steps=steps, seed=1, greeks=True)
+
+    def track_delta_error(self, paths, steps):
+        # pathwise delta against the Black-Scholes one, in standard errors
+        output = self.option.mc_model(paths=paths, steps=steps, seed=1, greeks=True)
+        return abs(output["greeks"]["Delta"] - self.option.bs_greeks("Delta")) / output["greeks_std_error"]["Delta"]
+    track_delta_error.unit = "standard errors"
+
+class Lattice:
+    # American prices of a single option (as in the app) and of whole batches broadcast through one tree
+    params = ([1, 1_000], [100, 500], [LatticeType.BINOMIAL.value, LatticeType.TRINOMIAL.value])
+    param_names = ["options", "steps", "tree"]
+
+    def setup(self, n, steps, tree):
+        self.option = random_options(n)
+
+    def time_lattice_model(self, n, steps, tree):
+        self.option.lattice_model(steps=steps, exercise=ExerciseType.AMERICAN.value, tree=tree)
+
+    def peakmem_lattice_model(self, n, steps, tree):
+        self.option.lattice_model(steps=steps, exercise=ExerciseType.AMERICAN.value, tree=tree)
+
+class LongstaffSchwartz:
+    # the American put of the app defaults, the lattice price is the reference
+    params = ([10_000, 100_000], [50, 250])
+    param_names = ["paths", "steps"]
+
+    def setup(self, paths, steps):
+        self.option = EuropeanOption(S=100.0, K=105.0, T=1.0, r=0.05, sigma=0.2, option_type=OptionType.PUT.value)
+
+    def time_lsm_model(self, paths, steps):
+        self.option.lsm_model(paths=paths, steps=steps, seed=1)
+
+    def peakmem_lsm_model(self, paths, steps):
+        self.option.lsm_model(paths=paths, steps=steps, seed=1)
+
+    def track_lattice_difference(self, paths, steps):
+        lattice = self.option.lattice_model(steps=1000)["price"]
+        return float(self.option.lsm_model(paths=paths, steps=steps, seed=1)["price"] - lattice)
+
+    track_lattice_difference.unit = "price"
+
+class PathDependent:
+    # the payoffs are streamed step by step, the peak memory stays at a few vectors of paths
+    params = ([payoff.value for payoff in PayoffType], [100, 500])
+    param_names = ["payoff", "steps"]
+
+    def setup(self, payoff, steps):
+        self.option = random_options(1)
+
+    def time_mc_path_dependent(self, payoff, steps):
+        self.option.mc_path_dependent(payoff, paths=50_000, steps=steps, seed=1, barrier=120.0)
+
+    def peakmem_mc_path_dependent(self, payoff, steps):
+        self.option.mc_path_dependent(payoff, paths=50_000, steps=steps, seed=1, barrier=120.0)
+
+class HestonChain:
+    # a whole chain of strikes on the same Heston paths, what one calibration step has to price
+    params = ([10_000, 50_000], [50, 100])
+    param_names = ["paths", "steps"]
+
+    def setup(self, paths, steps):
+        self.option = EuropeanOption(S=100.0,
+                                     K=np.linspace(50, 150, 50),
+                                     T=0.5,
+                                     r=0.04,
+                                     sigma=0.25,
+                                     option_type=OptionType.CALL.value
+                                     )
+        self.heston = HestonParameters(v0=0.04, kappa=2.0, theta=0.04, xi=0.3, rho=-0.7)
+
+    def time_mc_heston_model(self, paths, steps):
+        self.option.mc_heston_model(paths=paths, steps=steps, seed=1, heston=self.heston)
+
+    def peakmem_mc_heston_model(self, paths, steps):
+        self.option.mc_heston_model(paths=paths, steps=steps, seed=1, heston=self.heston)
+
+class FourierChain:
+    # a whole snapshot (every expiry and strike) priced with one FFT per expiry, against the Heston paths above
+    params = ([FourierModel.BLACK_SCHOLES.value, FourierModel.HESTON.value, FourierModel.VARIANCE_GAMMA.value],
+              [1, 20])
+    param_names = ["model", "expiries"]
+
+    def setup(self, model, expiries):
+        parameters = {FourierModel.BLACK_SCHOLES.value: [0.25],
+                      FourierModel.HESTON.value: [0.04, 2.0, 0.04, 0.3, -0.7],
+                      FourierModel.VARIANCE_GAMMA.value: [0.12, 0.2, -0.14]}
+        self.model = MODELS[model](*parameters[model])
+        self.K = np.tile(np.linspace(50, 150, 100), expiries)
+        self.T = np.repeat(np.linspace(0.05, 2, expiries), 100)
+
+    def time_fourier_prices(self, model, expiries):
+        fourier_prices(self.model, 100.0, self.K, self.T, 0.04, OptionType.CALL.value)
+
+class PortfolioRisk:
+    # full revaluation of a book of positions on three underlyings, the memory is bounded by the revaluation chunks
+    params = [100, 5_000]
+    param_names = ["positions"]
+
+    def setup(self, n):
+        rng = np.random.default_rng(0)
+        self.portfolio = Portfolio(tickers=rng.choice(["A", "B", "C"], n),
+                                   S=100.0,
+                                   K=rng.uniform(50, 150, n),
+                                   T=rng.uniform(0.05, 2, n),
+                                   r=0.04,
+                                   sigma=rng.uniform(0.1, 0.6, n),
+                                   option_type=rng.choice([OptionType.CALL.value, OptionType.PUT.value], n),
+                                   quantity=rng.integers(-10, 10, n)
+                                   )
+
+    def time_greeks(self, n):
+        self.portfolio.greeks()
+
+    def time_scenario_grid(self, n):
+        self.portfolio.scenario_grid(np.linspace(-0.3, 0.3, 21), np.linspace(-0.1, 0.1, 11), [0, 1, 5, 10, 21])
+
+    def time_monte_carlo_var(self, n):
+        self.portfolio.monte_carlo_var(days=10, scenarios=10_000, seed=1)
+
+    def peakmem_monte_carlo_var(self, n):
+        self.portfolio.monte_carlo_var(days=10, scenarios=10_000, seed=1)
+
+class MonteCarloChain:
+    # the whole chain of strikes on the same paths, as in the options table
+    params = [1, 50, 200]
+    param_names = ["strikes"]
+
+    def setup(self, n):
+        self.option = EuropeanOption(S=100.0,
+                                     K=np.linspace(50, 150, n),
+                                     T=0.5,
+                                     r=0.04,
+                                     sigma=0.25,
+                                     option_type=OptionType.CALL.value
+                                     )
+
+    def time_mc_model(self, n):
+        self.option.mc_model(paths=10_000, steps=100, seed=1)
+
+class MonteCarloCacheLookup:
+    # a repeated simulation (same inputs and seed) against the first one
+    params = [10_000, 100_000]
+    param_names = ["paths"]
+
+    def setup(self, paths):
+        self.cache = MonteCarloCache(max_bytes=64 * 1024**2)
+        self.sample_indices = np.arange(50)
+        self.job(paths).start().wait()
+
+    def job(self, paths):
+        return MonteCarloJob(random_options(1), paths=paths, steps=100, seed=1, batch_size=5000,
+                             sample_indices=self.sample_indices, cache=self.cache)
+
+    def time_uncached(self, paths):
+        MonteCarloJob(random_options(1), paths=paths, steps=100, seed=1, batch_size=5000,
+                      sample_indices=self.sample_indices).start().wait()
+
+    def time_cached(self, paths):
+        self.job(paths).start().wait()
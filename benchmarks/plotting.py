@@ -0,0 +1,101 @@
+# asv benchmarks of the figures rebuilt on every rerun of the app, see asv.conf.json
+from plotting.black_scholes import plot_payoffs, create_greek_graph
+from plotting.monte_carlo import plot_gbm_paths
+from pricing.option_pricing import EuropeanOption
+from src.profiling import deep_sizeof
+from config import AppSettings, Colors, Greeks, OptionType, VariableKey
+
+INPUT_PARAMETERS = {
+    VariableKey.S.value: 100.0,
+    VariableKey.K.value: 105.0,
+    VariableKey.T.value: 0.5,
+    VariableKey.R.value: 0.04,
+    VariableKey.SIGMA.value: 0.25
+}
+
+def figure_size(fig):
+    # bytes sent to the browser for a figure
+    return len(fig.to_json())
+
+class Payoffs:
+    params = [OptionType.CALL.value, OptionType.PUT.value]
+    param_names = ["option_type"]
+
+    def setup(self, option_type):
+        self.input_parameters = {**INPUT_PARAMETERS, VariableKey.OPTION_TYPE.value: option_type}
+        self.price = EuropeanOption(**self.input_parameters).bs_price()
+
+    def plot(self):
+        return plot_payoffs(self.input_parameters,
+                            modelled_price=self.price,
+                            config=AppSettings,
+                            color_config=Colors,
+                            color_toggle=True,
+                            bs_function_toggle=True
+                            )
+
+    def time_plot_payoffs(self, option_type):
+        self.plot()
+
+    def track_figure_json_size(self, option_type):
+        return figure_size(self.plot())
+
+    track_figure_json_size.unit = "bytes"
+
+class GreekGraph:
+    params = ([greek.value for greek in Greeks], [VariableKey.S.value, VariableKey.SIGMA.value, VariableKey.T.value])
+    param_names = ["greek", "variable"]
+
+    def plot(self, greek, variable):
+        return create_greek_graph(input_parameters={**INPUT_PARAMETERS, VariableKey.OPTION_TYPE.value: OptionType.CALL.value},
+                                  selected_variable=variable,
+                                  greek_to_plot=greek,
+                                  config=AppSettings,
+                                  color_config=Colors
+                                  )
+
+    def time_create_greek_graph(self, greek, variable):
+        self.plot(greek, variable)
+
+    def track_figure_json_size(self, greek, variable):
+        return figure_size(self.plot(greek, variable))
+
+    track_figure_json_size.unit = "bytes"
+
+class GBMPaths:
+    params = ([1_000, 10_000, 50_000], [10, 100, 250])
+    param_names = ["paths", "steps"]
+
+    def setup(self, paths, steps):
+        option = EuropeanOption(**INPUT_PARAMETERS, option_type=OptionType.CALL.value)
+        self.S_paths = option.mc_generate_paths(paths=paths, steps=steps, seed=1)
+
+    def plot(self):
+        return plot_gbm_paths(S_paths=self.S_paths,
+                              T=INPUT_PARAMETERS[VariableKey.T.value],
+                              r=INPUT_PARAMETERS[VariableKey.R.value],
+                              seed=1,
+                              config=AppSettings,
+                              color_config=Colors
+                              )
+
+    def time_plot_gbm_paths(self, paths, steps):
+        self.plot()
+
+    def track_figure_json_size(self, paths, steps):
+        gbm_plot, end_points_plot = self.plot()
+        return figure_size(gbm_plot) + figure_size(end_points_plot)
+
+    track_figure_json_size.unit = "bytes"
+
+    def track_figure_memory(self, paths, steps):
+        # what every session used to keep in its state
+        return deep_sizeof(self.plot())
+
+    track_figure_memory.unit = "bytes"
+
+    def track_sample_memory(self, paths, steps):
+        # what it keeps now, the figures are rebuilt from it
+        return deep_sizeof(self.S_paths[:AppSettings.MAX_GBM_LINES].astype("float32"))
+
+    track_sample_memory.unit = "bytes"
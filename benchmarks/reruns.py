@@ -0,0 +1,30 @@
+import sys
+import json
+import pandas as pd
+from config import AppSettings
+
+def load_reruns(path):
+    with open(path) as file:
+        return pd.DataFrame([json.loads(line) for line in file if line.strip()])
+
+def summarize_reruns(reruns):
+    """
+    Inputs: reruns (pd.DataFrame) records of the profiling log (AppSettings.PROFILING)
+    Outputs: (pd.DataFrame) rerun count and cost per scope - full app reruns vs the reruns of single fragments
+    """
+    return (reruns.groupby("scope")["total_ms"]
+            .describe(percentiles=[0.5, 0.9])[["count", "mean", "50%", "90%"]]
+            .rename(columns={"50%": "p50", "90%": "p90"})
+            .sort_values("mean", ascending=False))
+
+if __name__ == "__main__":
+    # run the app with AppSettings.PROFILING = True, interact with it, then summarize the log:
+    # python -m benchmarks.reruns [data/profiling.jsonl]
+    path = sys.argv[1] if len(sys.argv) > 1 else AppSettings.PROFILING_LOG_PATH
+    summary = summarize_reruns(load_reruns(path))
+    print(summary.round(1).to_string())
+
+    if "app" in summary.index:
+        full_rerun = summary.loc["app", "p50"]
+        for scope in summary.index.drop("app"):
+            print(f"{scope}: {summary.loc[scope, 'p50'] / full_rerun:.0%} of a full rerun (p50)")
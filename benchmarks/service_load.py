@@ -0,0 +1,73 @@
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from config import OptionType
+
+async def send(reader, writer, path, payload):
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    content_length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = int(value)
+    response = json.loads(await reader.readexactly(content_length))
+    if status != 200:
+        raise RuntimeError(f"{path} returned {status}: {response}")
+    return response
+
+def random_option(rng):
+    return {
+        "S": float(rng.uniform(50, 150)),
+        "K": float(rng.uniform(50, 150)),
+        "T": float(rng.uniform(0.05, 2)),
+        "r": 0.04,
+        "sigma": float(rng.uniform(0.1, 0.6)),
+        "option_type": str(rng.choice([OptionType.CALL.value, OptionType.PUT.value]))
+    }
+
+async def client(host, port, path, extra_payload, deadline, seed, latencies):
+    # one keep-alive connection sending requests back to back, like a closed-loop user
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await send(reader, writer, path, {**random_option(rng), **extra_payload})
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+async def run_load(host, port, path, extra_payload, concurrency, duration):
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(client(host, port, path, extra_payload, deadline, seed, latencies) for seed in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    print(f"{path} with {concurrency} concurrent clients for {elapsed:.1f} s")
+    print(f"Requests: {len(latencies):,} ({len(latencies) / elapsed:,.0f} req/s)")
+    print(f"Latency p50: {np.percentile(latencies, 50):.2f} ms, p99: {np.percentile(latencies, 99):.2f} ms")
+
+if __name__ == "__main__":
+    # start the service first: python -m pricing.service
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.service_load")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--monte-carlo", action="store_true", help="load the /monte-carlo route instead of /price")
+    args = parser.parse_args()
+
+    if args.monte_carlo:
+        asyncio.run(run_load(args.host, args.port, "/monte-carlo", {"paths": 10000, "steps": 100, "seed": 1},
+                             args.concurrency, args.duration))
+    else:
+        asyncio.run(run_load(args.host, args.port, "/price", {}, args.concurrency, args.duration))
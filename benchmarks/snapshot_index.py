@@ -0,0 +1,45 @@
+import time
+import numpy as np
+from benchmarks.synthetic import synthetic_snapshot
+from pricing.snapshot_index import SnapshotIndex
+from config import OptionType
+
+def mean_call_time(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+if __name__ == "__main__":
+    snapshot = synthetic_snapshot()
+
+    start = time.perf_counter()
+    index = SnapshotIndex(snapshot)
+    build_time = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    tickers = rng.choice(index.tickers, 1000)
+    option_types = rng.choice([OptionType.CALL.value, OptionType.PUT.value], 1000)
+    picks = iter(range(10**9))
+
+    def lookup_index():
+        i = next(picks) % len(tickers)
+        return index.locate(tickers[i], option_types[i])
+
+    def slice_index():
+        i = next(picks) % len(tickers)
+        return index.get_options(tickers[i], option_types[i])
+
+    def mask_dataframe():
+        # what the app effectively did per ticker before (after the network round trip)
+        i = next(picks) % len(tickers)
+        df = snapshot[snapshot["ticker"] == tickers[i]]
+        return df[df["option_type"] == option_types[i]]
+
+    print(f"Rows: {len(index)}, tickers: {len(index.tickers)}")
+    print(f"Index build: {build_time * 1000:.1f} ms")
+    print(f"Index memory: {index.memory_usage() / 2**20:.1f} MiB "
+          f"(source DataFrame: {snapshot.memory_usage(deep=True).sum() / 2**20:.1f} MiB)")
+    print(f"Binary search (ticker, option_type): {mean_call_time(lookup_index, 10000) * 1e6:.1f} µs")
+    print(f"DataFrame slice (ticker, option_type): {mean_call_time(slice_index, 2000) * 1e6:.1f} µs")
+    print(f"Boolean mask over the full snapshot: {mean_call_time(mask_dataframe, 200) * 1e6:.1f} µs")
@@ -0,0 +1,34 @@
+import time
+import numpy as np
+from benchmarks.synthetic import synthetic_snapshot, EXPIRY_LADDER
+from pricing.snapshot_pricing import price_options, years_to_expiry
+
+if __name__ == "__main__":
+    # full nightly snapshot - every S&P 500 ticker with its whole expiry ladder
+    snapshot = synthetic_snapshot(expiries=EXPIRY_LADDER)
+    rng = np.random.default_rng(0)
+    tickers = snapshot["ticker"].unique()
+    snapshot["underlying_price"] = snapshot["ticker"].map(dict(zip(tickers, rng.uniform(20, 500, len(tickers)))))
+    snapshot["historical_volatility"] = snapshot["ticker"].map(dict(zip(tickers, rng.uniform(0.1, 0.6, len(tickers)))))
+
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        price_options(snapshot,
+                      S=snapshot["underlying_price"].to_numpy(dtype=float),
+                      T=years_to_expiry(snapshot["expiry"], snapshot["snapshot_date"]),
+                      r=0.04,
+                      sigma=snapshot["historical_volatility"].to_numpy(dtype=float)
+                      )
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(f"Rows: {len(snapshot):,}")
+    print(f"Price + greeks + spread: {best:.3f} s ({len(snapshot) / best:,.0f} rows/s)")
+
+    # a single chain as priced by the options table in the app
+    chain = snapshot.iloc[:200]
+    start = time.perf_counter()
+    for _ in range(200):
+        price_options(chain, S=100.0, T=0.1, r=0.04, sigma=0.3)
+    print(f"200-strike chain: {(time.perf_counter() - start) / 200 * 1000:.2f} ms")
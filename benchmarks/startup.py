@@ -0,0 +1,59 @@
+import sys
+import json
+import subprocess
+
+# the streamlit server has these loaded before the script runs, so they don't count towards the start of the app
+SERVER_IMPORTS = "import streamlit, pandas"
+
+FIRST_RENDER_SCRIPT = """
+import json, time
+from streamlit.testing.v1 import AppTest
+from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+
+first_delta = []
+enqueue = ScriptRunContext.enqueue
+
+def timed_enqueue(self, msg):
+    if not first_delta and msg.HasField("delta"):
+        first_delta.append(time.perf_counter())
+    return enqueue(self, msg)
+
+ScriptRunContext.enqueue = timed_enqueue
+app = AppTest.from_file("app.py", default_timeout=300)
+start = time.perf_counter()
+app.run()
+print(json.dumps({"first_render_s": first_delta[0] - start, "full_rerun_s": time.perf_counter() - start}))
+"""
+
+def timeraw_import_app():
+    # asv runs this in a fresh interpreter, see asv.conf.json
+    return "import app", SERVER_IMPORTS
+
+def import_times():
+    """
+    Outputs: (int, list) cumulative import time of app.py in microseconds and the (module, self time) pairs it imported
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"{SERVER_IMPORTS}; import app"],
+                            capture_output=True, text=True, check=True)
+    lines = [line for line in result.stderr.splitlines() if line.startswith("import time:") and "|" in line]
+    rows = [[part.strip() for part in line[len("import time:"):].split("|")] for line in lines[1:]]
+
+    # the modules imported by app.py are the lines after the last module imported by the server imports
+    app_index = max(i for i, row in enumerate(rows) if row[2] == "app")
+    start_index = max(i for i, row in enumerate(rows[:app_index]) if row[2] == "pandas") + 1
+    app_modules = [(row[2].strip(), int(row[0])) for row in rows[start_index:app_index + 1]]
+    return int(rows[app_index][1]), app_modules
+
+def first_render_time():
+    result = subprocess.run([sys.executable, "-c", FIRST_RENDER_SCRIPT], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    app_import, app_modules = import_times()
+    print(f"import app: {app_import / 1000:.0f} ms (after '{SERVER_IMPORTS}')")
+    for module, self_time in sorted(app_modules, key=lambda module: -module[1])[:10]:
+        print(f"  {module:<50} {self_time / 1000:6.1f} ms")
+
+    timings = first_render_time()
+    print(f"Time to first render: {timings['first_render_s'] * 1000:.0f} ms")
+    print(f"Full first rerun: {timings['full_rerun_s'] * 1000:.0f} ms")
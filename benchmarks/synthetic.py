@@ -0,0 +1,48 @@
+import numpy as np
+from itertools import product
+import pandas as pd
+from config import OptionType
+
+SP500_TICKERS = 503
+STRIKES_PER_TICKER = 60 # per option type - roughly the size of a 30 day chain of a liquid S&P 500 name
+
+def synthetic_tickers(n_tickers=SP500_TICKERS):
+    rng = np.random.default_rng(0)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    tickers = set()
+    while len(tickers) < n_tickers:
+        tickers.add("".join(rng.choice(letters, rng.integers(1, 5))))
+    return sorted(tickers)
+
+# a typical listed ladder - weeklies first, then monthlies and LEAPS
+EXPIRY_LADDER = ["2026-10-23", "2026-10-30", "2026-11-06", "2026-11-20", "2026-12-18", "2027-01-15", "2027-02-19",
+                 "2027-03-19", "2027-06-17", "2027-09-17", "2027-12-17", "2028-01-21", "2028-06-16", "2028-12-15"]
+
+def synthetic_snapshot(n_tickers=SP500_TICKERS, strikes_per_ticker=STRIKES_PER_TICKER, expiries=("2026-11-20",),
+                       snapshot_date="2026-10-19", seed=0):
+    # mimics the rows returned by "get_options_by_ticker"
+    rng = np.random.default_rng(seed)
+    tickers = synthetic_tickers(n_tickers)
+    spots = rng.uniform(20, 500, n_tickers)
+
+    rows = []
+    for ticker, spot in zip(tickers, spots):
+        strikes = np.round(np.linspace(spot * 0.5, spot * 1.5, strikes_per_ticker), 1)
+        for expiry, option_type in product(expiries, (OptionType.CALL.value, OptionType.PUT.value)):
+            mid = np.maximum(spot - strikes if option_type == OptionType.CALL.value else strikes - spot, 0) + spot * 0.02
+            rows.append(pd.DataFrame({
+                "contractsymbol": [f"{ticker}{expiry[2:].replace('-', '')}{option_type[0]}{int(k * 1000):08d}" for k in strikes],
+                "ticker": ticker,
+                "option_type": option_type,
+                "strike": strikes,
+                "expiry": expiry,
+                "bid": mid * 0.98,
+                "ask": mid * 1.02,
+                "volume": rng.integers(0, 5000, strikes_per_ticker).astype(float),
+                "impliedvolatility": rng.uniform(0.15, 0.6, strikes_per_ticker),
+                "snapshot_date": snapshot_date,
+            }))
+
+    snapshot = pd.concat(rows, ignore_index=True)
+    # rows arrive from the database in no particular order
+    return snapshot.sample(frac=1, random_state=seed).reset_index(drop=True)
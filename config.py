@@ -9,6 +9,11 @@ class VariableKey(str, Enum): # define new variables / inputs through this it's
     OPTION_TYPE = "option_type"
     PATHS = "paths"
     STEPS = "steps"
+    TREE_STEPS = "tree_steps"
+    EXERCISE = "exercise"
+    TREE = "tree"
+    PAYOFF = "payoff"
+    BARRIER = "barrier"
     INTERVAL = "interval"
 
 class StreamlitInputs(str, Enum): # also important to add the new type of selectors
@@ -26,12 +31,41 @@ class OptionType(str, Enum):
     CALL = "Call"
     PUT = "Put"
 
+class ExerciseType(str, Enum):
+    AMERICAN = "American"
+    EUROPEAN = "European"
+
+class LatticeType(str, Enum):
+    BINOMIAL = "Binomial"
+    TRINOMIAL = "Trinomial"
+
+class PayoffType(str, Enum):
+    EUROPEAN = "European"
+    ASIAN_ARITHMETIC = "Asian (arithmetic)"
+    ASIAN_GEOMETRIC = "Asian (geometric)"
+    UP_AND_OUT = "Up-and-out barrier"
+    UP_AND_IN = "Up-and-in barrier"
+    DOWN_AND_OUT = "Down-and-out barrier"
+    DOWN_AND_IN = "Down-and-in barrier"
+    LOOKBACK = "Lookback"
+
+class FourierModel(str, Enum):
+    BLACK_SCHOLES = "Black-Scholes"
+    HESTON = "Heston"
+    VARIANCE_GAMMA = "Variance Gamma"
+
 class Greeks(str, Enum):
     DELTA = "Delta"
     GAMMA = "Gamma"
     VEGA = "Vega"
     THETA = "Theta"
     RHO = "Rho"
+    VANNA = "Vanna"
+    VOLGA = "Volga"
+    CHARM = "Charm"
+    SPEED = "Speed"
+    COLOR = "Color"
+    ZOMMA = "Zomma"
 
 class CandlestickInterval(str, Enum):
     MINUTE = "1m"
@@ -72,12 +106,34 @@ class AppSettings:
     CURRENCY = "$"
     MAX_GBM_LINES = 50
     SEED_INTERVAL = [1, 10000]
+    CHAIN_MC_PATHS = 10000 # Monte Carlo prices in the options table, all strikes share the same simulated paths
+    CHAIN_MC_STEPS = 100
+    MC_BATCH_PATHS = 5000 # the Monte Carlo tab simulates in batches of paths in the background and shows the progress
+    MC_PROGRESS_INTERVAL = 0.5 # seconds between the progressive updates of a running simulation
+    MC_CACHE_BYTES = 64 * 1024**2 # finished simulations shared by all the sessions, least recently used ones go first
+    MC_CACHE_SPILL_PATH = "data/mc_cache" # the evicted simulations are moved here (None drops them)
+    MC_CACHE_DISK_BYTES = 512 * 1024**2
 
-    MODELLED_OPTIONS_EXPIRY_DAYS = 30 # fetch option data that is closest to 30 days expiry from now
+    MODELLED_OPTIONS_EXPIRY_DAYS = 30 # show option data that is closest to 30 days expiry from now
+    EXPIRY_FETCH_WORKERS = 8 # the updater fetches the whole expiry ladder of a ticker concurrently
+    UPLOAD_BATCH_SIZE = 5000
     HV_PERIOD = "1mo" # choose how far back does the data for historical volatility calculation date
     # best to choose a similar timeframe to MODELLED_OPTIONS_EXPIRY_DAYS above
     HV_INTERVAL = "1d"
 
+    OHLCV_CACHE_PATH = "data/ohlcv" # price bars shared by the candlestick plot and the historical volatility
+    OHLCV_REFRESH_SECONDS = 60 # newer bars are fetched (incrementally) at most this often per ticker and interval
+
+    PRELOAD_SNAPSHOT = False # load the whole options snapshot once into memory instead of querying it per ticker
+    SNAPSHOT_TABLE = "options_snapshot"
+    SNAPSHOT_PAGE_SIZE = 1000 # default row limit of a single Supabase (PostgREST) response
+    OPTIONS_ARCHIVE_PATH = "data/options_archive" # local parquet history of all the daily snapshots
+
+    PROFILING = False # time the stages, loaders and plots of every rerun (no overhead at all when disabled)
+    PROFILING_LOG_PATH = "data/profiling.jsonl" # one JSON line per rerun
+    PROFILING_PANEL = True # show the timings of the last rerun in the sidebar (only when PROFILING is enabled)
+    PROFILING_HISTORY = 50 # reruns kept per session for the panel
+
     MAX_PERIODS = { # if you add a new value that's not "d", "mo" or "y" make sure to update the 'interval_to_text()' function
         CandlestickInterval.MINUTE.value: "1d", # "7d",
         CandlestickInterval.HOUR.value: "7d",
@@ -173,6 +229,46 @@ class AppSettings:
             input_type="number_input"
         ),
 
+        VariableKey.BARRIER.value: NumericSliderConfig(
+            label=f"Barrier in {CURRENCY}",
+            min_value=1.0,
+            max_value=500.0,
+            default=120.0,
+            step=1.0,
+            variable=VariableKey.BARRIER.value,
+            input_type="number_input"
+        ),
+
+    # =========================
+    # ==== Lattice configs ====
+    # =========================
+
+        VariableKey.TREE_STEPS.value: NumericSliderConfig(
+            label="Number of steps in the tree",
+            min_value=10.0,
+            max_value=2000.0,
+            default=200.0,
+            step=10.0,
+            variable=VariableKey.TREE_STEPS.value,
+            input_type="number_input"
+        ),
+
+        VariableKey.EXERCISE.value: SegmentedControlConfig(
+            label="Exercise",
+            options=[exercise.value for exercise in ExerciseType],
+            default=ExerciseType.AMERICAN.value,
+            selection_mode="single",
+            variable=VariableKey.EXERCISE.value
+        ),
+
+        VariableKey.TREE.value: SegmentedControlConfig(
+            label="Tree",
+            options=[tree.value for tree in LatticeType],
+            default=LatticeType.BINOMIAL.value,
+            selection_mode="single",
+            variable=VariableKey.TREE.value
+        ),
+
     # =============================
     # ==== Candlestick configs ====
     # =============================
@@ -3,6 +3,7 @@ import numpy as np
 from pricing.option_pricing import EuropeanOption
 from plotting.utils_plotting import create_axes, dashed_line
 from config import OptionType, VariableKey
+from src.profiling import profiled
 
 def get_annotations(K, option_type, modelled_price, rel_x_pos, rel_y_pos):
     
@@ -141,6 +142,7 @@ def hover_tooltips(K, modelled_price, option_type, fig, annotations, config):
         showlegend=False
     ))
 
+@profiled()
 def plot_payoffs(selected_parameters, modelled_price, config, 
                  color_config, color_toggle = False, bs_function_toggle = False):    
     try:
@@ -241,6 +243,7 @@ def plot_payoffs(selected_parameters, modelled_price, config,
 
     return fig
 
+@profiled()
 def create_greek_graph(input_parameters, selected_variable, greek_to_plot, config, color_config):
     input_parameters = input_parameters.copy()
     x_values = np.linspace(config.STREAMLIT_INPUT_CONFIGS[selected_variable].min, 
@@ -1,6 +1,7 @@
 import plotly.graph_objects as go
 import pandas as pd
 from config import CandlestickInterval
+from src.profiling import profiled
 
 def add_weekend_line(fig, df):
     difference = pd.Timedelta("1d")
@@ -25,6 +26,7 @@ def add_weekend_line(fig, df):
             font=dict(color="gray")
         )
 
+@profiled()
 def plot_candlestick_asset(df, selected_interval, color_config):
     fig = go.Figure()
 
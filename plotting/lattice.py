@@ -0,0 +1,46 @@
+import plotly.graph_objects as go
+import numpy as np
+from pricing.option_pricing import EuropeanOption
+from plotting.utils_plotting import dashed_line
+from config import VariableKey
+from src.profiling import profiled
+
+@profiled()
+def plot_lattice_convergence(input_parameters, steps, exercise, tree, color_config, points=12):
+    """
+    Inputs: input_parameters (dict) of the option, steps (int) of the priced tree, exercise (str) ExerciseType,
+            tree (str) LatticeType, points (int) number of tree sizes up to steps
+    Outputs: (go.Figure) the price of the plain tree and of the smoothed and extrapolated one against the number of steps
+    """
+    option = EuropeanOption(**input_parameters)
+    steps_grid = np.unique(np.geomspace(10, max(steps, 10), points).astype(int))
+
+    smoothed_color = color_config.option_type_red_green(input_parameters[VariableKey.OPTION_TYPE.value])
+
+    fig = go.Figure()
+    for name, smoothing, color in [("Plain tree", False, color_config.SEAMLESS_GREY),
+                                   ("Smoothed + Richardson", True, smoothed_color)]:
+        prices = [option.lattice_model(steps=n, exercise=exercise, tree=tree, smoothing=smoothing,
+                                       extrapolate=smoothing)["price"]
+                  for n in steps_grid]
+        fig.add_trace(go.Scatter(
+            x=steps_grid,
+            y=prices,
+            mode="lines+markers",
+            name=name,
+            line=dict(color=color)
+        ))
+
+    # the European price is the limit of both trees, American options can only be worth more
+    dashed_line(fig, [steps_grid[0], steps_grid[-1]], [option.bs_price()], opacity=0.5)
+
+    fig.update_layout(
+        margin=dict(t=50, b=50, l=0, r=0),
+        xaxis_title="Steps",
+        yaxis_title="Price",
+        height=450,
+        legend=dict(orientation="h", y=1.1)
+    )
+    fig.update_xaxes(type="log")
+
+    return fig
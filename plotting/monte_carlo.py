@@ -1,9 +1,11 @@
 import numpy as np
 import plotly.graph_objects as go
-from scipy.stats import gaussian_kde
 from plotting.utils_plotting import dashed_line
+from src.profiling import profiled
 
 def kernel_density_vertical(fig, S_paths, T, randomized_selection, color_config):
+    from scipy.stats import gaussian_kde # scipy.stats is slow to import, only needed once the paths are plotted
+
     terminal_prices = S_paths[randomized_selection, -1]
     
     kde = gaussian_kde(terminal_prices)
@@ -22,9 +24,12 @@ def kernel_density_vertical(fig, S_paths, T, randomized_selection, color_config)
     fig.update_xaxes(range = [T - max(scaled_density) * 0.1, T + max(scaled_density) * 1.1])
 
 
-def plot_gbm_paths(S_paths, T, r, seed, config, color_config):
-
+def sample_path_indices(n_paths, seed, config):
     np.random.seed(seed)
+    return np.random.choice(n_paths, min(config.MAX_GBM_LINES, n_paths), replace=False)
+
+@profiled()
+def plot_gbm_paths(S_paths, T, r, seed, config, color_config):
 
     n_paths, n_steps_plus1 = S_paths.shape
     n_steps = n_steps_plus1 - 1
@@ -33,26 +38,29 @@ def plot_gbm_paths(S_paths, T, r, seed, config, color_config):
     fig = go.Figure()
     fig_end_points = go.Figure()
 
-    randomized_selection = np.random.choice(n_paths, min(config.MAX_GBM_LINES, n_paths), replace=False)
+    randomized_selection = sample_path_indices(n_paths, seed, config)
 
     non_risk_x = np.array([0, T])
     non_risk_linear_f = S_paths[0,0] * np.exp(r * non_risk_x)
 
-    for i in randomized_selection:
-        fig.add_trace(go.Scatter(
-            x=time_grid,
-            y=S_paths[i],
-            mode="lines",
-            name=f"Path {i+1}",
-            line=dict(width=1),
-            opacity=0.75
-        ))
-        fig_end_points.add_trace(go.Scatter(
-            x=[time_grid[-1]],
-            y=[S_paths[i, -1]],
-            name=f"Path {i+1}",
-            mode="markers+lines"
-        ))
+    # the traces are added at once as plain dicts, plotly then validates every one of them only once
+    # (the figures are rebuilt from the stored paths on every render)
+    fig.add_traces([dict(
+        type="scatter",
+        x=time_grid,
+        y=S_paths[i],
+        mode="lines",
+        name=f"Path {i+1}",
+        line=dict(width=1),
+        opacity=0.75
+    ) for i in randomized_selection])
+    fig_end_points.add_traces([dict(
+        type="scatter",
+        x=[time_grid[-1]],
+        y=[S_paths[i, -1]],
+        name=f"Path {i+1}",
+        mode="markers+lines"
+    ) for i in randomized_selection])
 
     fig.add_trace(go.Scatter(
         x=non_risk_x,
@@ -90,6 +98,7 @@ def plot_gbm_paths(S_paths, T, r, seed, config, color_config):
 
     return fig, fig_end_points
 
+@profiled()
 def plot_confidence_interval(modelled_price, confidence_interval, option_type, color_config):
 
     if modelled_price > 1:
@@ -0,0 +1,113 @@
+import os
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pricing.option_pricing import EuropeanOption
+from config import Greeks, VariableKey
+
+INPUT_COLUMNS = [
+    VariableKey.S.value,
+    VariableKey.K.value,
+    VariableKey.T.value,
+    VariableKey.R.value,
+    VariableKey.SIGMA.value,
+    VariableKey.OPTION_TYPE.value
+]
+MARKET_PRICE_COLUMN = "market_price"
+
+def read_chunks(path, chunk_size):
+    # the input is never loaded at once, only chunk_size rows at a time
+    if path.endswith(".parquet"):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif path.endswith(".csv"):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    else:
+        raise ValueError("Input file has to be a .csv or a .parquet file")
+
+def price_chunk(chunk):
+    missing_columns = [column for column in INPUT_COLUMNS if column not in chunk.columns]
+    if missing_columns:
+        raise ValueError(f"Missing input columns: {missing_columns}")
+
+    # the numeric columns are always written as float64, otherwise a chunk of integer strikes would fix an int64
+    # parquet schema that the later fractional strikes can't be cast to
+    numeric_columns = [column for column in INPUT_COLUMNS + [MARKET_PRICE_COLUMN]
+                       if column in chunk.columns and column != VariableKey.OPTION_TYPE.value]
+    chunk = chunk.astype({column: float for column in numeric_columns})
+
+    option = EuropeanOption(**{column: chunk[column].to_numpy() for column in INPUT_COLUMNS})
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chunk["price"] = option.bs_price()
+        greeks = option.bs_greeks()
+        for greek in Greeks:
+            chunk[greek.value.lower()] = greeks[greek.value]
+
+        # the implied volatility only makes sense if there's a market price to invert
+        if MARKET_PRICE_COLUMN in chunk.columns:
+            chunk["implied_volatility"] = option.implied_volatility(chunk[MARKET_PRICE_COLUMN].to_numpy(dtype=float))
+
+    return chunk
+
+def price_file(input_path, output_path, chunk_size, workers):
+    start = time.perf_counter()
+    rows = 0
+    writer = None
+
+    def write(chunk):
+        nonlocal writer, rows
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, table.schema, compression="zstd")
+        # the schema of the first chunk is kept (e.g. an all null column is read as null in one chunk only),
+        # the numeric columns are float64 in every chunk (price_chunk)
+        writer.write_table(table.cast(writer.schema))
+
+        rows += len(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"{rows:,} rows priced ({rows / elapsed:,.0f} rows/s)", flush=True)
+
+    try:
+        if workers == 1:
+            for chunk in read_chunks(input_path, chunk_size):
+                write(price_chunk(chunk))
+        else:
+            # at most 2 chunks per worker are in flight, so the memory stays bounded regardless of the file size
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for chunk in read_chunks(input_path, chunk_size):
+                    pending.append(executor.submit(price_chunk, chunk))
+                    if len(pending) >= workers * 2:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Done: {rows:,} rows in {elapsed:.1f} s ({rows / max(elapsed, 1e-9):,.0f} rows/s) -> '{output_path}'")
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pricing.batch",
+                                     description="Black-Scholes prices, greeks and implied volatilities for a file of options. "
+                                                 f"Required columns: {', '.join(INPUT_COLUMNS)} "
+                                                 f"(optional '{MARKET_PRICE_COLUMN}' for the implied volatility)."
+                                     )
+    parser.add_argument("input", help="input .csv or .parquet file")
+    parser.add_argument("output", help="output .parquet file")
+    parser.add_argument("--chunk-size", type=int, default=500_000, help="rows priced at once (default: 500000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    price_file(args.input, args.output, chunk_size=args.chunk_size, workers=max(args.workers, 1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import numpy as np
+from pricing.heston import HestonParameters
+from pricing.volatility_surface import prepare_smiles
+from config import OptionType, FourierModel
+
+FFT_POINTS = 4096
+FFT_SPACING = 0.25 # spacing of the integration grid, the log strikes are then 2 * pi / (FFT_POINTS * FFT_SPACING) apart
+DAMPING = 1.5 # Carr-Madan alpha, makes the call price square integrable in the log strike
+
+class BlackScholesParameters:
+    def __init__(self, sigma):
+        if sigma <= 0:
+            raise ValueError("Black-Scholes needs sigma > 0")
+        self.sigma = float(sigma)
+
+    def characteristic_function(self, u, S, T, r):
+        return np.exp(1j * u * (np.log(S) + (r - 0.5 * self.sigma**2) * T) - 0.5 * self.sigma**2 * u**2 * T)
+
+    def to_array(self):
+        return np.array([self.sigma])
+
+class VarianceGammaParameters:
+    def __init__(self, sigma, nu, theta):
+        # Brownian motion with drift theta and volatility sigma, run on a gamma clock with variance rate nu
+        if sigma <= 0 or nu <= 0 or 1 - theta * nu - 0.5 * sigma**2 * nu <= 0:
+            raise ValueError("Variance Gamma needs sigma, nu > 0 and 1 - theta * nu - sigma^2 * nu / 2 > 0")
+        self.sigma = float(sigma)
+        self.nu = float(nu)
+        self.theta = float(theta)
+
+    def characteristic_function(self, u, S, T, r):
+        # omega makes the discounted price a martingale
+        omega = np.log(1 - self.theta * self.nu - 0.5 * self.sigma**2 * self.nu) / self.nu
+        base = 1 - 1j * u * self.theta * self.nu + 0.5 * self.sigma**2 * self.nu * u**2
+        return np.exp(1j * u * (np.log(S) + (r + omega) * T)) * base**(-T / self.nu)
+
+    def to_array(self):
+        return np.array([self.sigma, self.nu, self.theta])
+
+MODELS = {
+    FourierModel.BLACK_SCHOLES.value: BlackScholesParameters,
+    FourierModel.HESTON.value: HestonParameters,
+    FourierModel.VARIANCE_GAMMA.value: VarianceGammaParameters
+}
+
+# initial guesses and (lower, upper) bounds of the calibrated parameters, in the order of the constructors
+CALIBRATION_START = {
+    FourierModel.BLACK_SCHOLES.value: ([0.2], ([1e-3], [5.0])),
+    FourierModel.HESTON.value: ([0.04, 1.5, 0.04, 0.5, -0.5], ([1e-4, 1e-2, 1e-4, 1e-2, -0.99], [4.0, 20.0, 4.0, 5.0, 0.99])),
+    FourierModel.VARIANCE_GAMMA.value: ([0.2, 0.2, -0.1], ([1e-3, 1e-3, -2.0], [5.0, 5.0, 2.0]))
+}
+
+def carr_madan_calls(model, S, T, r, points=FFT_POINTS, spacing=FFT_SPACING, alpha=DAMPING):
+    """
+    Inputs: model (BlackScholesParameters, HestonParameters or VarianceGammaParameters), S, T (np.ndarray) of shape
+            (maturities,), r (float), points (int) of the FFT, spacing (float) of the integration grid, alpha (float)
+    Outputs: (np.ndarray, np.ndarray) the (maturities, points) log strikes centered at log S and the call prices on
+             them, every maturity is priced on its whole strike grid by one FFT
+    """
+    S = np.asarray(S, dtype=float).reshape(-1, 1)
+    T = np.asarray(T, dtype=float).reshape(-1, 1)
+    u = spacing * np.arange(points)
+    log_strike_step = 2 * np.pi / (points * spacing)
+    lowest_log_strike = np.log(S) - points * log_strike_step / 2
+
+    # Fourier transform of the damped call price
+    shifted_u = u - (alpha + 1) * 1j
+    psi = (np.exp(-r * T) * model.characteristic_function(shifted_u, S, T, r)
+           / (alpha**2 + alpha - u**2 + 1j * (2 * alpha + 1) * u))
+
+    # Simpson weights of the integral
+    weights = spacing / 3 * (3 + (-1)**(np.arange(points) + 1))
+    weights[0] = spacing / 3
+
+    log_strikes = lowest_log_strike + log_strike_step * np.arange(points)
+    transformed = np.fft.fft(np.exp(-1j * u * lowest_log_strike) * psi * weights, axis=-1)
+    calls = np.exp(-alpha * log_strikes) / np.pi * transformed.real
+
+    return log_strikes, calls
+
+def fourier_prices(model, S, K, T, r, option_type, **fft_options):
+    """
+    Inputs: model (parameters of one of MODELS), S, K, T, option_type - scalars or arrays that broadcast together
+            (e.g. a whole snapshot), r (float), fft_options passed to carr_madan_calls
+    Outputs: (np.ndarray) prices interpolated from the strike grid of every (S, T) pair onto the strikes K
+    """
+    arrays = np.broadcast_arrays(np.asarray(S, dtype=float), np.asarray(K, dtype=float),
+                                 np.asarray(T, dtype=float), np.asarray(option_type))
+    shape = arrays[0].shape
+    S, K, T, option_type = (array.ravel() for array in arrays)
+    if not np.all(np.isin(option_type, [OptionType.CALL.value, OptionType.PUT.value])):
+        raise ValueError(f"option_type is different")
+
+    # one FFT per distinct maturity (and spot), shared by all of its strikes
+    pairs, pair_index = np.unique(np.column_stack([S, T]), axis=0, return_inverse=True)
+    pair_index = pair_index.ravel()
+    log_strikes, calls = carr_madan_calls(model, pairs[:, 0], pairs[:, 1], r, **fft_options)
+
+    call_prices = np.empty(len(K))
+    for i in range(len(pairs)):
+        rows = pair_index == i
+        call_prices[rows] = np.interp(np.log(K[rows]), log_strikes[i], calls[i])
+
+    # put-call parity
+    prices = np.where(option_type == OptionType.CALL.value, call_prices, call_prices - S + K * np.exp(-r * T))
+    return prices.reshape(shape)[()]
+
+def market_quotes(df, r):
+    # the out-of-the-money quotes with a market (the same selection as the volatility surface), every expiry is
+    # priced from the spot implied by its forward, so the dividends don't have to be known
+    quotes = prepare_smiles(df, r)
+    return quotes.assign(mid=(quotes["bid"] + quotes["ask"]) / 2,
+                         S=quotes["forward"] * np.exp(-r * quotes["T"]))
+
+def calibrate_model(df, r, model=FourierModel.HESTON.value, initial=None):
+    """
+    Inputs: df (pd.DataFrame) snapshot rows of one ticker (get_data_from_supabase), r (float) risk-free rate,
+            model (str) FourierModel, initial (list) starting parameters
+    Outputs: (model parameters, float) the fitted parameters and the root mean squared price error of the quotes
+    """
+    from scipy.optimize import least_squares
+
+    quotes = market_quotes(df, r)
+    if quotes.empty:
+        raise ValueError("No quotes to calibrate the model to")
+
+    S, K, T = quotes["S"].to_numpy(), quotes["strike"].to_numpy(), quotes["T"].to_numpy()
+    option_type, mid = quotes["option_type"].to_numpy(), quotes["mid"].to_numpy()
+    start, bounds = CALIBRATION_START[model]
+
+    def residuals(params):
+        try:
+            parameters = MODELS[model](*params)
+        except ValueError: # outside of the valid region (e.g. the Variance Gamma martingale condition)
+            return np.full(len(mid), 1.0)
+        # errors relative to the spot, so that expensive and cheap underlyings weigh the same
+        return (fourier_prices(parameters, S, K, T, r, option_type) - mid) / S
+
+    result = least_squares(residuals, initial if initial is not None else start, bounds=bounds)
+    parameters = MODELS[model](*result.x)
+    rmse = np.sqrt(np.mean((fourier_prices(parameters, S, K, T, r, option_type) - mid)**2))
+    return parameters, rmse
+
+def calibrate_ticker(supabase_client, selected_ticker, r, model=FourierModel.HESTON.value, snapshot_index=None):
+    from pricing.stocks_options import get_data_from_supabase
+
+    options_data = get_data_from_supabase(supabase_client, selected_ticker, snapshot_index=snapshot_index)
+    options_data.columns = options_data.columns.str.lower()
+    return calibrate_model(options_data, r, model=model)
@@ -0,0 +1,91 @@
+import numpy as np
+from scipy.special import ndtri
+
+QE_SWITCH = 1.5 # Andersen's critical psi, below it the quadratic branch of the QE scheme is used, above it the exponential
+
+class HestonParameters:
+    def __init__(self, v0, kappa, theta, xi, rho):
+        # dv = kappa * (theta - v) dt + xi * sqrt(v) dW_v, d<W_S, W_v> = rho dt
+        if xi <= 0 or v0 < 0 or theta < 0 or kappa <= 0 or not -1 <= rho <= 1:
+            raise ValueError("Heston parameters need xi > 0, kappa > 0, v0, theta >= 0 and -1 <= rho <= 1")
+        self.v0 = float(v0)
+        self.kappa = float(kappa)
+        self.theta = float(theta)
+        self.xi = float(xi)
+        self.rho = float(rho)
+
+    def feller_condition(self):
+        # when it holds, the variance process never touches zero
+        return 2 * self.kappa * self.theta > self.xi**2
+
+    def characteristic_function(self, u, S, T, r):
+        # E[exp(iu log S_T)], in the formulation of Albrecher et al. that has no branch cut problems for long maturities
+        kappa, theta, xi, rho = self.kappa, self.theta, self.xi, self.rho
+        beta = kappa - rho * xi * 1j * u
+        d = np.sqrt(beta**2 + xi**2 * (1j * u + u**2))
+        g = (beta - d) / (beta + d)
+        decay = np.exp(-d * T)
+
+        C = kappa * theta / xi**2 * ((beta - d) * T - 2 * np.log((1 - g * decay) / (1 - g)))
+        D = (beta - d) / xi**2 * (1 - decay) / (1 - g * decay)
+        return np.exp(1j * u * (np.log(S) + r * T) + C + D * self.v0)
+
+    def to_array(self):
+        return np.array([self.v0, self.kappa, self.theta, self.xi, self.rho])
+
+def qe_variance_step(v, U, kappa, theta, xi, dt):
+    # Andersen's quadratic-exponential step of the variance, matches its conditional mean and variance exactly
+    decay = np.exp(-kappa * dt)
+    m = theta + (v - theta) * decay
+    s2 = v * xi**2 * decay * (1 - decay) / kappa + theta * xi**2 * (1 - decay)**2 / (2 * kappa)
+    psi = s2 / np.maximum(m**2, 1e-300)
+
+    # both branches on all the paths (np.where instead of masked indexing, which is slower on these sizes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inverse_psi = 2 / psi
+        b2 = np.maximum(inverse_psi - 1 + np.sqrt(inverse_psi) * np.sqrt(np.maximum(inverse_psi - 1, 0)), 0)
+        quadratic_v = m / (1 + b2) * (np.sqrt(b2) + ndtri(np.maximum(U, 1e-300)))**2
+
+        p = (psi - 1) / (psi + 1)
+        beta = (1 - p) / m
+        exponential_v = np.where(U <= p, 0.0, np.log((1 - p) / np.maximum(1 - U, 1e-300)) / beta)
+
+    next_v = np.where(psi <= QE_SWITCH, quadratic_v, exponential_v)
+    return next_v
+
+def heston_path_batches(S, T, r, heston, paths, steps, seed, batch_size):
+    """
+    Inputs: S, T, r (float), heston (HestonParameters), paths, steps, seed (int), batch_size (int) paths simulated at once
+    Outputs: (generator) start and the (batch, steps + 1) price paths of every batch
+    The price shocks are the same stream as mc_path_batches (RandomState(seed)), the variance has its own stream,
+    both are drawn batch by batch in the order of the paths, so the paths don't depend on the batch size
+    """
+    paths = int(paths)
+    steps = int(steps)
+    price_state = np.random.RandomState(seed)
+    variance_state = np.random.RandomState([seed, 1])
+
+    dt = T / steps
+    kappa, theta, xi, rho = heston.kappa, heston.theta, heston.xi, heston.rho
+    # the log price step of the QE scheme (central discretization of the integrated variance, gamma1 = gamma2 = 1/2)
+    K0 = -rho * kappa * theta / xi * dt
+    K1 = 0.5 * dt * (kappa * rho / xi - 0.5) - rho / xi
+    K2 = 0.5 * dt * (kappa * rho / xi - 0.5) + rho / xi
+    K3 = 0.5 * dt * (1 - rho**2)
+
+    for start in range(0, paths, batch_size):
+        batch = min(batch_size, paths - start)
+        # drawn path by path like the GBM engine, stepped through time by time (contiguous rows of all the paths)
+        Z = np.ascontiguousarray(price_state.randn(batch, steps).T)
+        U = np.ascontiguousarray(variance_state.random_sample((batch, steps)).T)
+
+        log_S = np.empty((steps + 1, batch))
+        log_S[0] = np.log(S)
+        v = np.full(batch, heston.v0)
+        for step in range(steps):
+            next_v = qe_variance_step(v, U[step], kappa, theta, xi, dt)
+            log_S[step + 1] = (log_S[step] + (r * dt + K0) + K1 * v + K2 * next_v
+                               + np.sqrt(np.maximum(K3 * (v + next_v), 0)) * Z[step])
+            v = next_v
+
+        yield start, np.exp(log_S.T)
@@ -0,0 +1,83 @@
+import numpy as np
+from scipy.special import ndtr
+from config import LatticeType
+
+def tree_parameters(r, sigma, dt, tree):
+    """
+    Inputs: r, sigma, dt (np.ndarray) of shape (n, 1), tree (str) LatticeType - binomial (Cox-Ross-Rubinstein)
+            or trinomial (Hull)
+    Outputs: (np.ndarray, int, list) log of the up move, how many node indices one up move spans
+             and the (node offset, probability) pairs of the branches from a node
+    """
+    if tree == LatticeType.BINOMIAL.value:
+        log_u = sigma * np.sqrt(dt)
+        p = (np.exp(r * dt) - np.exp(-log_u)) / (np.exp(log_u) - np.exp(-log_u))
+        return log_u, 2, [(0, 1 - p), (1, p)]
+    elif tree == LatticeType.TRINOMIAL.value:
+        log_u = sigma * np.sqrt(3 * dt)
+        drift = (r - 0.5 * sigma**2) * np.sqrt(dt / (12 * sigma**2))
+        return log_u, 1, [(0, 1 / 6 - drift), (1, 2 / 3), (2, 1 / 6 + drift)]
+    else:
+        raise ValueError(f"tree must be '{LatticeType.BINOMIAL.value}' or '{LatticeType.TRINOMIAL.value}'")
+
+def bs_values(S, K, r, sigma, sign, tau):
+    # European values one step before maturity (the Black-Scholes smoothing of the last step)
+    sigma_sqrt_tau = sigma * np.sqrt(tau)
+    d1 = (np.log(S / K) + (r + sigma**2 * 0.5) * tau) / sigma_sqrt_tau
+    d2 = d1 - sigma_sqrt_tau
+    return sign * (S * ndtr(sign * d1) - K * np.exp(-r * tau) * ndtr(sign * d2))
+
+def backward_induction(S, K, T, r, sigma, sign, steps, american, tree, smoothing):
+    """
+    Inputs: S, K, T, r, sigma, sign (np.ndarray) of shape (n, 1), +1 for calls and -1 for puts, steps (int),
+            american (bool) early exercise, tree (str), smoothing (bool) Black-Scholes values on the last step (BBS)
+    Outputs: (np.ndarray) of shape (n,) the prices of all the options, induced backwards together
+    """
+    dt = T / steps
+    discount = np.exp(-r * dt)
+    log_u, span, branches = tree_parameters(r, sigma, dt, tree)
+
+    last_step = steps - 1 if smoothing else steps
+    # every node of the lattice is S*u^e for an e between -last_step and last_step, the nodes of a step are
+    # a strided slice of them (binomial S*u^(2j - step), trinomial S*u^(j - step)), so exp is evaluated only once
+    prices = S * np.exp(log_u * np.arange(-last_step, last_step + 1))
+    exercise = np.maximum(sign * (prices - K), 0)
+
+    def step_nodes(array, step):
+        return array[:, last_step - step:last_step + step + 1:span]
+
+    # a single buffer as wide as the last step, every step back only uses its first (shrinking) part
+    values = (bs_values(step_nodes(prices, last_step), K, r, sigma, sign, dt) if smoothing
+              else step_nodes(exercise, last_step).copy())
+    if american:
+        np.maximum(values, step_nodes(exercise, last_step), out=values)
+
+    for step in range(last_step - 1, -1, -1):
+        width = (2 // span) * step + 1
+        continuation = sum(probability * values[:, offset:offset + width] for offset, probability in branches)
+        values[:, :width] = discount * continuation
+        if american:
+            np.maximum(values[:, :width], step_nodes(exercise, step), out=values[:, :width])
+
+    return values[:, 0]
+
+def lattice_price(S, K, T, r, sigma, sign, steps, american=True, tree=LatticeType.BINOMIAL.value, smoothing=True,
+                  extrapolate=True):
+    """
+    Inputs: S, K, T, r, sigma, sign - scalars or arrays that broadcast together, steps (int) of the lattice,
+            american (bool), tree (str) LatticeType, smoothing (bool) Black-Scholes values on the last
+            step, extrapolate (bool) Richardson extrapolation 2 * P(steps) - P(steps / 2)
+    Outputs: (np.ndarray) prices of the broadcast shape
+    """
+    arrays = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (S, K, T, r, sigma, sign)))
+    shape = arrays[0].shape
+    S, K, T, r, sigma, sign = (array.reshape(-1, 1) for array in arrays)
+
+    steps = int(steps)
+    price = backward_induction(S, K, T, r, sigma, sign, steps, american, tree, smoothing)
+    if extrapolate:
+        # the error of the smoothed lattice falls like 1/steps, the extrapolation cancels its leading term
+        half_price = backward_induction(S, K, T, r, sigma, sign, steps // 2, american, tree, smoothing)
+        price = 2 * price - half_price
+
+    return price.reshape(shape)[()]
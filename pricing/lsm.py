@@ -0,0 +1,72 @@
+import numpy as np
+from scipy.special import ndtri
+
+def simulate_block(random_state, log_S, drift, volatility, block_steps, paths):
+    # log prices after every step of a block, the draws are (steps, paths) so that a block can be replayed
+    Z = random_state.standard_normal((block_steps, paths))
+    return log_S + np.cumsum(drift + volatility * Z, axis=0)
+
+def longstaff_schwartz(S, K, T, r, sigma, sign, paths, steps, seed, degree=3, block_steps=None, alpha=0.05):
+    """
+    Inputs: S, K, T, r, sigma (float), sign (float) +1 for calls and -1 for puts, paths, steps (int) exercise dates,
+            seed (int), degree (int) of the polynomial in S/K the continuation value is regressed on,
+            block_steps (int) steps of the path matrix held in memory at once (sqrt(steps) by default), alpha (float)
+    Outputs: (dict) American price of the option and its confidence interval
+    """
+    paths = int(paths)
+    steps = int(steps)
+    block_steps = int(block_steps or np.ceil(np.sqrt(steps)))
+
+    dt = T / steps
+    drift = (r - 0.5 * sigma**2) * dt
+    volatility = sigma * np.sqrt(dt)
+    discount = np.exp(-r * dt)
+
+    # forward pass: only the terminal prices are kept, plus the random state and the prices at the start of every
+    # block - the backward pass replays one block at a time, so at most paths x block_steps prices are in memory
+    random_state = np.random.RandomState(seed)
+    log_S = np.full(paths, np.log(S))
+    checkpoints = []
+    for start in range(0, steps, block_steps):
+        checkpoints.append((start, random_state.get_state(), log_S))
+        # a copy, a view of the last row would keep the whole block alive in the checkpoints
+        log_S = simulate_block(random_state, log_S, drift, volatility, min(block_steps, steps - start), paths)[-1].copy()
+
+    # the discounted cash flow of every path, starting with the payoff at maturity
+    cash_flows = np.maximum(sign * (np.exp(log_S) - K), 0)
+
+    for start, state, block_log_S in reversed(checkpoints):
+        random_state.set_state(state)
+        block = simulate_block(random_state, block_log_S, drift, volatility, min(block_steps, steps - start), paths)
+
+        # steps start + 1 ... start + len(block), maturity (the last step) is not an early exercise date
+        for i in range(len(block) - 1, -1, -1):
+            cash_flows *= discount
+            if start + i + 1 == steps:
+                continue
+
+            S_t = np.exp(block[i])
+            exercise = np.maximum(sign * (S_t - K), 0)
+            # only the paths in the money are regressed, only there is early exercise a question
+            in_the_money = np.flatnonzero(exercise > 0)
+            if len(in_the_money) <= degree:
+                continue
+
+            # least squares through the (degree + 1) x (degree + 1) normal equations, S/K keeps them well conditioned
+            basis = np.vander(S_t[in_the_money] / K, degree + 1, increasing=True)
+            coefficients = np.linalg.solve(basis.T @ basis, basis.T @ cash_flows[in_the_money])
+            continuation = basis @ coefficients
+
+            exercised = in_the_money[exercise[in_the_money] > continuation]
+            cash_flows[exercised] = exercise[exercised]
+
+    # from the first step back to today, where the option can be exercised as well
+    cash_flows *= discount
+    price = max(cash_flows.mean(), max(sign * (S - K), 0))
+    std_error = np.std(cash_flows, ddof=1) / np.sqrt(paths)
+    z_score = ndtri(1 - alpha / 2)
+
+    return {
+        "price": price,
+        "confidence_interval": [price - std_error * z_score, price + std_error * z_score]
+    }
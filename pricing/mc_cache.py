@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+def mc_cache_key(**inputs):
+    """
+    Inputs: the inputs that determine a simulation, e.g. S, K, T, r, sigma, option_type, paths, steps, seed, engine
+    Outputs: (str) sha256 of the inputs - equal inputs give the same key in every session and process
+    """
+    canonical = {}
+    for name, value in inputs.items():
+        value = np.asarray(value)
+        # 100 and 100.0 are the same input, numbers are compared as floats (K can be a whole chain of strikes)
+        if value.dtype.kind in "biuf":
+            value = value.astype(float)
+        canonical[name] = value.tolist()
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+class MonteCarloCache:
+    """
+    Inputs: max_bytes (int) memory budget of the cached arrays, spill_path (str or None) directory the least recently
+            used entries are moved to instead of being dropped, max_disk_bytes (int) budget of that directory
+    Outputs: the results of finished simulations (dicts of arrays) shared by all the sessions of the process
+    """
+    def __init__(self, max_bytes, spill_path=None, max_disk_bytes=0):
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self.max_disk_bytes = max_disk_bytes
+
+        self.entries = OrderedDict() # least recently used first
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.counts = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "spills": 0}
+
+    @staticmethod
+    def entry_bytes(entry):
+        return sum(value.nbytes for value in entry.values())
+
+    def path(self, key):
+        return os.path.join(self.spill_path, f"{key}.npz")
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.counts["hits"] += 1
+                return entry
+
+        entry = self.load(key)
+        with self.lock:
+            if entry is None:
+                self.counts["misses"] += 1
+                return None
+            self.counts["disk_hits"] += 1
+        self.put(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        entry = {name: np.asarray(value) for name, value in entry.items()}
+        size = self.entry_bytes(entry)
+        if size > self.max_bytes:
+            return
+
+        evicted = []
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entry_bytes(self.entries.pop(key))
+            self.entries[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                evicted_key, evicted_entry = self.entries.popitem(last=False)
+                self.bytes -= self.entry_bytes(evicted_entry)
+                self.counts["evictions"] += 1
+                evicted.append((evicted_key, evicted_entry))
+
+        # the disk is written outside of the lock, the other sessions keep reading the memory in the meantime
+        for evicted_key, evicted_entry in evicted:
+            self.spill(evicted_key, evicted_entry)
+
+    def load(self, key):
+        if self.spill_path is None or not os.path.exists(self.path(key)):
+            return None
+        try:
+            with np.load(self.path(key)) as stored:
+                return {name: stored[name] for name in stored.files}
+        except (OSError, ValueError): # removed or half written by another process in the meantime
+            return None
+
+    def spill(self, key, entry):
+        if self.spill_path is None:
+            return
+        os.makedirs(self.spill_path, exist_ok=True)
+        temporary_path = f"{self.path(key)}.{threading.get_ident()}.tmp.npz"
+        np.savez(temporary_path, **entry)
+        os.replace(temporary_path, self.path(key)) # readers never see a half written file
+        with self.lock:
+            self.counts["spills"] += 1
+        self.trim_disk()
+
+    def trim_disk(self):
+        # the oldest spilled files go first once the directory is over its budget
+        files = [entry for entry in os.scandir(self.spill_path) if entry.name.endswith(".npz") and ".tmp" not in entry.name]
+        files.sort(key=lambda file: file.stat().st_mtime)
+        disk_bytes = sum(file.stat().st_size for file in files)
+        for file in files:
+            if disk_bytes <= self.max_disk_bytes:
+                break
+            disk_bytes -= file.stat().st_size
+            try:
+                os.remove(file.path)
+            except FileNotFoundError:
+                pass
+
+    def metrics(self):
+        with self.lock:
+            lookups = self.counts["hits"] + self.counts["disk_hits"] + self.counts["misses"]
+            return {
+                **self.counts,
+                "hit_rate": (self.counts["hits"] + self.counts["disk_hits"]) / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "bytes": self.bytes
+            }
@@ -0,0 +1,51 @@
+import numpy as np
+
+GREEK_UNITS = {"Delta": 1, "Gamma": 1, "Vega": 100, "Rho": 100} # the estimates are divided by these, as in bs_greeks
+
+def greek_estimators(discounted_payoffs, S, T, r, sigma, terminal, first_shock, shock_square_sum, steps,
+                     pathwise=None, mixed_gamma=True):
+    """
+    Inputs: discounted_payoffs (np.ndarray) of shape (paths,) or (paths, strikes), S, T, r, sigma (float),
+            terminal (np.ndarray) S_T of every path, first_shock, shock_square_sum (np.ndarray) the normal draw of the
+            first step and the sum of the squared draws of all the steps of every path, steps (int),
+            pathwise (np.ndarray) discounted derivative of the payoff times the price it is on (S times the pathwise
+            delta), None for discontinuous payoffs, mixed_gamma (bool) gamma from the pathwise delta instead of the
+            likelihood ratio
+    Outputs: (dict) per path estimator of every greek, their means are the greeks - computed from the simulated
+             paths only, without any bumped simulation
+    """
+    # the scores (derivatives of the log density of the path) are per path, the payoffs can be a chain of strikes
+    column = (-1,) + (1,) * (np.ndim(discounted_payoffs) - 1)
+    dt = T / steps
+    W_T = ((np.log(terminal / S) - (r - 0.5 * sigma**2) * T) / sigma).reshape(column)
+    delta_score = (first_shock / (S * sigma * np.sqrt(dt))).reshape(column)
+    vega_score = ((shock_square_sum - steps) / sigma).reshape(column) - W_T
+
+    # S only enters the first step of the path, its score is the one of that step
+    lr_gamma = discounted_payoffs * (delta_score**2 - delta_score / S - 1 / (S**2 * sigma**2 * dt))
+    if pathwise is None:
+        delta = discounted_payoffs * delta_score
+        gamma = lr_gamma
+    else:
+        delta = pathwise / S
+        # d/dS of E[pathwise] / S, the pathwise delta is differentiated through the density of the first step
+        gamma = pathwise * (delta_score * S - 1) / S**2 if mixed_gamma else lr_gamma
+
+    return {
+        "Delta": delta,
+        "Gamma": gamma,
+        "Vega": discounted_payoffs * vega_score,
+        # r is in the drift of every step and in the discount factor
+        "Rho": discounted_payoffs * (W_T / sigma - T)
+    }
+
+def summarize_greeks(estimators):
+    # means and standard errors of the per path estimators, in the units of bs_greeks
+    paths = len(next(iter(estimators.values())))
+    greeks = {}
+    std_errors = {}
+    for greek, values in estimators.items():
+        greeks[greek] = values.mean(axis=0) / GREEK_UNITS[greek]
+        std_errors[greek] = values.std(axis=0, ddof=1) / np.sqrt(paths) / GREEK_UNITS[greek]
+
+    return {"greeks": greeks, "greeks_std_error": std_errors}
@@ -0,0 +1,143 @@
+import threading
+import numpy as np
+from scipy.special import ndtri
+from pricing.mc_cache import mc_cache_key
+from config import PayoffType
+
+class RunningMoments:
+    # mean and variance merged batch by batch (Chan et al.), the payoffs never have to be kept
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        n = len(values)
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean)**2).sum(axis=0)
+
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + batch_m2 + delta**2 * self.count * n / total
+        self.count = total
+
+    def std(self, ddof=1):
+        return np.sqrt(self.m2 / (self.count - ddof)) if self.count > ddof else np.nan * self.m2
+
+class MonteCarloJob:
+    """
+    Inputs: option (EuropeanOption), paths, steps, seed (int), batch_size (int) paths simulated at once,
+            sample_indices (np.ndarray) of the paths kept for plotting, alpha (float) of the confidence interval,
+            cache (MonteCarloCache or None) finished simulations are stored in and restored from,
+            product (str) PayoffType, barrier (float) of the barrier payoffs
+    Outputs: the price and the confidence interval of mc_model (mc_path_dependent for the path-dependent payoffs),
+             updated in a background thread after every batch
+    """
+    def __init__(self, option, paths, steps, seed, batch_size, sample_indices, alpha=0.05, cache=None,
+                 product=PayoffType.EUROPEAN.value, barrier=None):
+        self.option = option
+        self.paths = int(paths)
+        self.steps = int(steps)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.sample_indices = np.asarray(sample_indices)
+        self.z_score = ndtri(1 - alpha / 2)
+        self.product = product
+        self.barrier = barrier
+        self.cache = cache
+        # the path-dependent payoffs are drawn batch by batch, their paths also depend on the batch size
+        self.cache_key = mc_cache_key(S=option.S, K=option.K, T=option.T, r=option.r, sigma=option.sigma,
+                                      option_type=option.option_type, paths=self.paths, steps=self.steps,
+                                      seed=seed, engine="gbm", samples=self.sample_indices, product=product,
+                                      barrier=barrier, batch_size=batch_size)
+
+        self.moments = RunningMoments()
+        self.sample_paths = np.empty((len(self.sample_indices), self.steps + 1))
+        self.finished = False
+        self.error = None
+
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        # a simulation that any session has already finished is restored without simulating anything
+        if self.cache is not None and (result := self.cache.get(self.cache_key)) is not None:
+            return self.restore(result)
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        # checked before every batch, a stale job stops within one batch
+        self.cancelled.set()
+
+    def wait(self, timeout=None):
+        if self.thread.ident is not None:
+            self.thread.join(timeout)
+        return self.finished
+
+    def result(self):
+        # the moments instead of the price, so that the confidence interval can be rebuilt for any alpha
+        with self.lock:
+            return {
+                "count": self.moments.count,
+                "mean": self.moments.mean,
+                "m2": self.moments.m2,
+                "sample_paths": self.sample_paths
+            }
+
+    def restore(self, result):
+        with self.lock:
+            self.moments.count = int(result["count"])
+            self.moments.mean = result["mean"][()]
+            self.moments.m2 = result["m2"][()]
+            self.sample_paths = result["sample_paths"]
+            self.finished = True
+        return self
+
+    def batches(self):
+        # discounted payoffs, the sample indices within the batch and their paths, batch by batch
+        if self.product != PayoffType.EUROPEAN.value:
+            yield from self.option.mc_path_dependent_batches(self.product, self.paths, self.steps, self.seed,
+                                                             self.batch_size,
+                                                             barrier=self.barrier,
+                                                             sample_indices=self.sample_indices
+                                                             )
+            return
+
+        for start, S_paths in self.option.mc_path_batches(self.paths, self.steps, self.seed, self.batch_size):
+            in_batch = (self.sample_indices >= start) & (self.sample_indices < start + len(S_paths))
+            yield start, self.option.mc_discounted_payoffs(S_paths[:, -1]), in_batch, S_paths[self.sample_indices[in_batch] - start]
+
+    def run(self):
+        try:
+            for _, discounted_payoffs, in_batch, sample_paths in self.batches():
+                if self.cancelled.is_set():
+                    return
+
+                with self.lock:
+                    self.moments.update(discounted_payoffs)
+                    self.sample_paths[in_batch] = sample_paths
+        except Exception as error:
+            self.error = error
+        finally:
+            with self.lock:
+                self.finished = not self.cancelled.is_set()
+        if self.finished and self.error is None and self.cache is not None:
+            self.cache.put(self.cache_key, self.result())
+
+    def progress(self):
+        if self.error is not None:
+            raise self.error
+
+        with self.lock:
+            price = self.moments.mean
+            std_error = self.moments.std() / np.sqrt(max(self.moments.count, 1))
+            return {
+                "paths_done": self.moments.count,
+                "paths": self.paths,
+                "price": price,
+                "confidence_interval": [price - std_error * self.z_score, price + std_error * self.z_score],
+                "finished": self.finished
+            }
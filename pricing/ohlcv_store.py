@@ -0,0 +1,99 @@
+import os
+import time
+import threading
+import pandas as pd
+
+PERIOD_UNITS = {
+    "d": "days",
+    "wk": "weeks",
+    "mo": "months",
+    "y": "years"
+}
+
+def period_to_offset(period):
+    num = int("".join(filter(str.isdigit, period)))
+    unit = "".join(filter(str.isalpha, period))
+    try:
+        return pd.DateOffset(**{PERIOD_UNITS[unit]: num})
+    except KeyError:
+        raise ValueError(f"period unit '{unit}' not defined!")
+
+def history_period(interval, config):
+    # the stored history of an interval covers the longest period any part of the app asks for
+    periods = [config.MAX_PERIODS[interval]]
+    if interval == config.HV_INTERVAL:
+        periods.append(config.HV_PERIOD)
+    now = pd.Timestamp.now()
+    return max(periods, key=lambda period: now + period_to_offset(period))
+
+class OHLCVStore:
+    def __init__(self, root, refresh_seconds):
+        self.root = root
+        self.refresh_seconds = refresh_seconds
+        self.frames = {}
+        self.last_refresh = {}
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+        self.network_calls = 0
+
+    def path(self, ticker, interval):
+        return os.path.join(self.root, interval, f"{ticker}.parquet")
+
+    def lock(self, key):
+        with self.locks_lock:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def download(self, ticker, interval, **period_or_start):
+        import yfinance as yf # imported on the first download, not on the app start
+
+        self.network_calls += 1
+        df = yf.download(ticker, interval=interval, progress=False, **period_or_start)
+        if df is None or df.empty:
+            return None
+        return df.xs(ticker, axis=1, level=1)
+
+    def load(self, key):
+        path = self.path(*key)
+        if not os.path.exists(path):
+            return None
+        self.last_refresh[key] = os.path.getmtime(path)
+        return pd.read_parquet(path)
+
+    def save(self, key, df):
+        path = self.path(*key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        df.to_parquet(temporary_path)
+        os.replace(temporary_path, path) # readers never see a half written file
+
+    def refresh(self, key, df, full_period):
+        ticker, interval = key
+        if df is None:
+            df = self.download(ticker, interval, period=full_period)
+        else:
+            # only the bars from the last stored one onwards - the last one was possibly still forming
+            new_bars = self.download(ticker, interval, start=df.index[-1])
+            if new_bars is not None:
+                df = pd.concat([df[df.index < new_bars.index[0]], new_bars])
+                df = df[df.index >= df.index[-1] - period_to_offset(full_period)]
+
+        if df is not None:
+            self.save(key, df)
+            self.last_refresh[key] = time.time()
+        return df
+
+    def get(self, ticker, interval, period, config):
+        key = (ticker, interval)
+        with self.lock(key):
+            df = self.frames.get(key)
+            if df is None:
+                df = self.load(key)
+
+            if df is None or time.time() - self.last_refresh.get(key, 0) > self.refresh_seconds:
+                df = self.refresh(key, df, full_period=history_period(interval, config))
+            if df is None:
+                raise ValueError(f"No price data available for {ticker}")
+
+            self.frames[key] = df
+
+        return df[df.index >= df.index[-1] - period_to_offset(period)]
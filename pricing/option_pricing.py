@@ -1,6 +1,11 @@
 import numpy as np
-from scipy.stats import norm
-from config import OptionType
+from scipy.special import ndtr, ndtri
+from pricing.lattice import lattice_price
+from pricing.lsm import longstaff_schwartz
+from pricing.path_dependent import stream_path_statistics, path_dependent_payoffs, pathwise_payoffs
+from pricing.mc_greeks import greek_estimators, summarize_greeks
+from pricing.heston import heston_path_batches
+from config import OptionType, ExerciseType, LatticeType, PayoffType
 
 class EuropeanOption:
     def __init__(self, S, K, T, r, sigma, option_type):
@@ -8,7 +13,8 @@ class EuropeanOption:
         self.K = np.array(K)
         self.T = np.array(T)
         self.r = np.array(r)
-        self.sigma = np.array(sigma)
+        # sigma can also be a volatility surface - any callable sigma(K, T), e.g. VolatilitySurface
+        self.sigma = np.array(sigma(self.K, self.T)) if callable(sigma) else np.array(sigma)
         self.option_type = np.array(option_type)
 
     def calculate_d1_d2(self):
@@ -16,49 +22,106 @@ class EuropeanOption:
         d2 = d1 - self.sigma * np.sqrt(self.T)
         return d1, d2
 
+    def option_type_sign(self):
+        # +1 for calls and -1 for puts, so that both can be priced in one vectorized pass (option_type can be an array)
+        is_call = self.option_type == OptionType.CALL.value
+        is_put = self.option_type == OptionType.PUT.value
+        if not np.all(is_call | is_put):
+            raise ValueError(f"option_type is different")
+        return np.where(is_call, 1.0, -1.0)
+
     def bs_price(self):
         d1, d2 = self.calculate_d1_d2()
+        sign = self.option_type_sign()
 
-        if self.option_type == OptionType.CALL.value:
-            price = self.S * norm.cdf(d1) - self.K * np.exp(-self.r * self.T) * norm.cdf(d2)
-        elif self.option_type == OptionType.PUT.value:
-            price = self.K * np.exp(-self.r * self.T) * norm.cdf(-d2) - self.S * norm.cdf(-d1)
+        price = sign * (self.S * ndtr(sign * d1) - self.K * np.exp(-self.r * self.T) * ndtr(sign * d2))
         return price
     
     def bs_greeks(self, greek_to_return="All"):
         d1, d2 = self.calculate_d1_d2()
-        if self.option_type == OptionType.CALL.value:
-            delta = norm.cdf(d1)
-            theta = (-self.S * norm.pdf(d1) * self.sigma / (2 * np.sqrt(self.T))
-                    - self.r * self.K * np.exp(-self.r * self.T) * norm.cdf(d2))
-            rho = self.K * self.T * np.exp(-self.r * self.T) * norm.cdf(d2)
-        elif self.option_type == OptionType.PUT.value:
-            delta = norm.cdf(d1) - 1
-            theta = (-self.S * norm.pdf(d1) * self.sigma / (2 * np.sqrt(self.T))
-                    + self.r * self.K * np.exp(-self.r * self.T) * norm.cdf(-d2))
-            rho = -self.K * self.T * np.exp(-self.r * self.T) * norm.cdf(-d2)
-        else:
-            raise ValueError(f"option_type is different")
+        sign = self.option_type_sign()
 
-        gamma = norm.pdf(d1) / (self.S * self.sigma * np.sqrt(self.T))
-        vega = self.S * norm.pdf(d1) * np.sqrt(self.T)
+        # terms shared by the greeks are only evaluated once (ndtr is the normal cdf without the scipy.stats overhead)
+        sqrt_T = np.sqrt(self.T)
+        sigma_sqrt_T = self.sigma * sqrt_T
+        pdf_d1 = np.exp(-0.5 * d1**2) / np.sqrt(2 * np.pi)
+        discounted_K = self.K * np.exp(-self.r * self.T)
+        cdf_signed_d2 = ndtr(sign * d2)
+        gamma = pdf_d1 / (self.S * sigma_sqrt_T)
+        vega = self.S * pdf_d1 * sqrt_T
+        # d(d1)/dt, shared by the decay of delta (charm) and gamma (color)
+        d1_decay = (2 * self.r * self.T - d2 * sigma_sqrt_T) / (2 * self.T * sigma_sqrt_T)
 
-        greek_return_dict = {
-            "Delta": delta,
-            "Gamma": gamma,
-            "Vega": vega / 100,
-            "Theta": theta / 365,
-            "Rho": rho / 100   
+        # only the selected greek is evaluated, e.g. for the sweeps of create_greek_graph
+        greek_formulas = {
+            "Delta": lambda: sign * ndtr(sign * d1),
+            "Gamma": lambda: gamma,
+            "Vega": lambda: vega / 100,
+            "Theta": lambda: (-self.S * pdf_d1 * self.sigma / (2 * sqrt_T)
+                              - sign * self.r * discounted_K * cdf_signed_d2) / 365,
+            "Rho": lambda: sign * self.T * discounted_K * cdf_signed_d2 / 100,
+            # second and third order, per vol point (1%) and per day like vega and theta
+            "Vanna": lambda: -pdf_d1 * d2 / self.sigma / 100,
+            "Volga": lambda: vega * d1 * d2 / self.sigma / 100**2,
+            "Charm": lambda: -pdf_d1 * d1_decay / 365,
+            "Speed": lambda: -gamma / self.S * (d1 / sigma_sqrt_T + 1),
+            "Color": lambda: gamma / (2 * self.T) * (1 + 2 * self.T * d1 * d1_decay) / 365,
+            "Zomma": lambda: gamma * (d1 * d2 - 1) / self.sigma / 100
         }
 
         if greek_to_return == "All":
-            return greek_return_dict
+            return {greek: formula() for greek, formula in greek_formulas.items()}
         else:
             try:
-                return greek_return_dict[greek_to_return]
-            except:
+                return greek_formulas[greek_to_return]()
+            except KeyError:
                 raise ValueError("Invalid greek selection")
             
+    def implied_volatility(self, market_price, tolerance=1e-8, max_iterations=100, sigma_bounds=(1e-6, 5.0)):
+        # vectorized Newton-Raphson on the Black-Scholes price, every step is kept inside a bisection bracket,
+        # so it can't diverge for deep in/out of the money options where vega is close to zero
+        sign = self.option_type_sign()
+        arrays = np.broadcast_arrays(self.S, self.K, self.T, self.r, sign, np.asarray(market_price, dtype=float))
+        shape = arrays[0].shape
+        S, K, T, r, sign, market_price = (array.ravel() for array in arrays)
+
+        sigma = np.full(len(S), 0.3)
+        lower = np.full(len(S), sigma_bounds[0])
+        upper = np.full(len(S), sigma_bounds[1])
+        discounted_K = K * np.exp(-r * T)
+
+        # only the options that haven't converged yet are iterated on
+        active = np.arange(len(S))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for _ in range(max_iterations):
+                if len(active) == 0:
+                    break
+                a_S, a_K, a_T, a_r, a_sign, a_sigma = S[active], K[active], T[active], r[active], sign[active], sigma[active]
+                sqrt_T = np.sqrt(a_T)
+                d1 = (np.log(a_S / a_K) + (a_r + a_sigma**2 * 0.5) * a_T) / (a_sigma * sqrt_T)
+                d2 = d1 - a_sigma * sqrt_T
+                price = a_sign * (a_S * ndtr(a_sign * d1) - discounted_K[active] * ndtr(a_sign * d2))
+                vega = a_S * np.exp(-0.5 * d1**2) / np.sqrt(2 * np.pi) * sqrt_T
+
+                # the price is increasing in sigma, so the sign of the difference tells which side the root is on
+                difference = price - market_price[active]
+                upper[active] = np.where(difference > 0, a_sigma, upper[active])
+                lower[active] = np.where(difference < 0, a_sigma, lower[active])
+                newton_sigma = a_sigma - difference / vega
+                inside_bracket = (newton_sigma > lower[active]) & (newton_sigma < upper[active])
+                sigma[active] = np.where(inside_bracket, newton_sigma, (lower[active] + upper[active]) / 2)
+
+                converged = (np.abs(difference) < tolerance) | (upper[active] - lower[active] < tolerance)
+                sigma[active] = np.where(np.abs(difference) < tolerance, a_sigma, sigma[active])
+                active = active[~converged]
+
+            # outside of the no-arbitrage bounds there is no volatility that reproduces the price
+            min_price = np.maximum(sign * (S - discounted_K), 0)
+            max_price = np.where(sign > 0, S, discounted_K)
+            arbitrage_free = (market_price > min_price) & (market_price < max_price)
+
+        return np.where(arbitrage_free, sigma, np.nan).reshape(shape)[()]
+
     def mc_generate_paths(self, paths, steps, seed):
         paths = int(paths)
         steps = int(steps)
@@ -73,24 +136,170 @@ class EuropeanOption:
 
         return S_paths
 
-    def mc_model(self, paths, steps, seed, include_ci=True, alpha = 0.05):
-        S_paths = self.mc_generate_paths(paths, steps, seed)
-        last_column = S_paths[:, -1]
+    def mc_path_batches(self, paths, steps, seed, batch_size):
+        # the same paths as mc_generate_paths (same random stream), but only batch_size of them in memory at a time
+        paths = int(paths)
+        steps = int(steps)
+        random_state = np.random.RandomState(seed)
+
+        dt = self.T / steps
+        for start in range(0, paths, batch_size):
+            Z = random_state.randn(min(batch_size, paths - start), steps)
+            increments = (self.r - 0.5 * self.sigma**2) * dt + self.sigma * np.sqrt(dt) * Z
+            log_S = np.cumsum(increments, axis=1)
+            log_S = np.hstack((np.zeros((len(Z), 1)), log_S))
+            yield start, self.S * np.exp(log_S)
 
-        if self.option_type == OptionType.CALL.value:
-            payoffs = np.maximum(last_column - self.K, 0)
-        elif self.option_type == OptionType.PUT.value:
-            payoffs = np.maximum(self.K - last_column, 0)
+    def mc_discounted_payoffs(self, terminal_prices):
+        sign = self.option_type_sign()
 
-        discounted_payoff = np.exp(-self.r * self.T) * payoffs
-        price_estimate = np.mean(discounted_payoff)
+        # K (and option_type) can be arrays - e.g. all strikes of a chain - the payoffs of all of them are then
+        # evaluated against the same simulated paths (common random numbers) with a broadcast
+        last_column = terminal_prices.reshape((-1,) + (1,) * np.ndim(sign * self.K))
+        payoffs = np.maximum(sign * (last_column - self.K), 0)
+
+        return np.exp(-self.r * self.T) * payoffs
+
+    def mc_greek_estimators(self, terminal_prices, discounted_payoff, mixed_gamma=True):
+        # only S_T enters the payoff, so the scores of its density are enough - a single step of length T
+        S, T, r, sigma = (float(value) for value in (self.S, self.T, self.r, self.sigma))
+        first_shock = (np.log(terminal_prices / S) - (r - 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
+
+        terminal_column = terminal_prices.reshape((-1,) + (1,) * (discounted_payoff.ndim - 1))
+        pathwise = self.option_type_sign() * np.exp(-r * T) * terminal_column * (discounted_payoff > 0)
+        return greek_estimators(discounted_payoff, S, T, r, sigma, terminal_prices, first_shock, first_shock**2, 1,
+                                pathwise=pathwise,
+                                mixed_gamma=mixed_gamma
+                                )
+
+    def mc_model(self, paths, steps, seed, include_ci=True, alpha = 0.05, greeks=False, mixed_gamma=True):
+        S_paths = self.mc_generate_paths(paths, steps, seed)
+        discounted_payoff = self.mc_discounted_payoffs(S_paths[:, -1])
+        price_estimate = np.mean(discounted_payoff, axis=0)
 
         output = {"price": price_estimate}
         if include_ci:
-            std_error = np.std(discounted_payoff, ddof=1) / np.sqrt(len(payoffs))
-            z_score = norm.ppf(1 - alpha / 2)
+            std_error = np.std(discounted_payoff, ddof=1, axis=0) / np.sqrt(len(discounted_payoff))
+            z_score = ndtri(1 - alpha / 2)
 
             confidence_interval = [price_estimate - std_error * z_score, price_estimate + std_error * z_score] 
             output["confidence_interval"] = confidence_interval
 
-        return output
\ No newline at end of file
+        if greeks:
+            # delta, gamma, vega and rho (with their standard errors) from the same paths, no bumped simulations
+            output.update(summarize_greeks(self.mc_greek_estimators(S_paths[:, -1], discounted_payoff, mixed_gamma)))
+
+        return output
+
+    def mc_heston_batches(self, paths, steps, seed, batch_size, heston):
+        # Heston paths in the same batches as mc_path_batches, sigma is replaced by the stochastic variance
+        return heston_path_batches(float(self.S), float(self.T), float(self.r), heston, paths, steps, seed, batch_size)
+
+    def mc_heston_model(self, paths, steps, seed, heston, include_ci=True, alpha=0.05, batch_size=50_000):
+        # mean and variance of the payoffs are merged batch by batch (K can be a whole chain of strikes)
+        from pricing.mc_jobs import RunningMoments
+
+        moments = RunningMoments()
+        for _, S_paths in self.mc_heston_batches(paths, steps, seed, batch_size, heston):
+            moments.update(self.mc_discounted_payoffs(S_paths[:, -1]))
+        price_estimate = moments.mean
+
+        output = {"price": price_estimate}
+        if include_ci:
+            std_error = moments.std() / np.sqrt(moments.count)
+            z_score = ndtri(1 - alpha / 2)
+
+            confidence_interval = [price_estimate - std_error * z_score, price_estimate + std_error * z_score]
+            output["confidence_interval"] = confidence_interval
+
+        return output
+
+    def scalar_parameters(self):
+        if self.S.ndim or self.K.ndim or self.T.ndim or self.sigma.ndim or self.option_type.ndim:
+            raise ValueError("path-dependent payoffs are priced for a single option, the inputs must be scalars")
+        S, K, T, r, sigma = (float(value) for value in (self.S, self.K, self.T, self.r, self.sigma))
+        return S, K, T, r, sigma, float(self.option_type_sign())
+
+    def mc_path_dependent_batches(self, product, paths, steps, seed, batch_size, barrier=None, control_variate=True,
+                                  sample_indices=None):
+        """
+        Inputs: product (str) PayoffType, paths, steps, seed, batch_size (int), barrier (float) of the barrier payoffs,
+                control_variate (bool) geometric Asian control variate, sample_indices (np.ndarray) paths kept for plots
+        Outputs: (generator) start, discounted payoffs, sample_indices within the batch and their paths for every batch,
+                 the path statistics are streamed step by step, so only vectors of batch_size prices are in memory
+        """
+        S, K, T, r, sigma, sign = self.scalar_parameters()
+        paths = int(paths)
+        steps = int(steps)
+        random_state = np.random.RandomState(seed)
+        sample_indices = np.asarray([] if sample_indices is None else sample_indices, dtype=int)
+
+        for start in range(0, paths, batch_size):
+            batch = min(batch_size, paths - start)
+            in_batch = (sample_indices >= start) & (sample_indices < start + batch)
+            statistics, sample_paths = stream_path_statistics(S, T, r, sigma, batch, steps, random_state,
+                                                              sample_rows=sample_indices[in_batch] - start)
+            payoffs = path_dependent_payoffs(statistics, product, K, T, r, sigma, sign, S,
+                                             barrier=barrier,
+                                             control_variate=control_variate
+                                             )
+            yield start, payoffs, in_batch, sample_paths
+
+    def mc_path_dependent(self, product, paths, steps, seed, barrier=None, control_variate=True, alpha=0.05,
+                          greeks=False, mixed_gamma=True):
+        # the same paths as a single batch of mc_path_dependent_batches
+        S, K, T, r, sigma, sign = self.scalar_parameters()
+        statistics, _ = stream_path_statistics(S, T, r, sigma, int(paths), int(steps), np.random.RandomState(seed),
+                                               scores=greeks)
+        discounted_payoff = path_dependent_payoffs(statistics, product, K, T, r, sigma, sign, S,
+                                                   barrier=barrier,
+                                                   control_variate=control_variate
+                                                   )
+        price_estimate = np.mean(discounted_payoff)
+        std_error = np.std(discounted_payoff, ddof=1) / np.sqrt(len(discounted_payoff))
+        z_score = ndtri(1 - alpha / 2)
+
+        output = {
+            "price": price_estimate,
+            "confidence_interval": [price_estimate - std_error * z_score, price_estimate + std_error * z_score]
+        }
+
+        if greeks:
+            # the control variate's exact price depends on the inputs too, the greeks are taken of the plain payoffs
+            if control_variate and product == PayoffType.ASIAN_ARITHMETIC.value:
+                discounted_payoff = path_dependent_payoffs(statistics, product, K, T, r, sigma, sign, S,
+                                                           control_variate=False)
+            estimators = greek_estimators(discounted_payoff, S, T, r, sigma, statistics.terminal,
+                                          statistics.first_shock, statistics.shock_square_sum, statistics.steps,
+                                          pathwise=pathwise_payoffs(statistics, product, K, T, r, sign),
+                                          mixed_gamma=mixed_gamma
+                                          )
+            output.update(summarize_greeks(estimators))
+
+        return output
+
+    def lattice_model(self, steps, exercise=ExerciseType.AMERICAN.value, tree=LatticeType.BINOMIAL.value,
+                      smoothing=True, extrapolate=True):
+        # backward induction on a binomial/trinomial lattice, also for the early exercise of American options
+        if exercise not in [exercise_type.value for exercise_type in ExerciseType]:
+            raise ValueError(f"exercise must be '{ExerciseType.AMERICAN.value}' or '{ExerciseType.EUROPEAN.value}'")
+
+        price = lattice_price(self.S, self.K, self.T, self.r, self.sigma, self.option_type_sign(), steps,
+                              american=exercise == ExerciseType.AMERICAN.value,
+                              tree=tree,
+                              smoothing=smoothing,
+                              extrapolate=extrapolate
+                              )
+        return {"price": price}
+
+    def lsm_model(self, paths, steps, seed, degree=3, block_steps=None, alpha=0.05):
+        # American exercise on the simulated GBM paths (Longstaff-Schwartz), for a single option
+        if self.S.ndim or self.K.ndim or self.T.ndim or self.sigma.ndim or self.option_type.ndim:
+            raise ValueError("lsm_model prices a single option, the inputs must be scalars")
+
+        return longstaff_schwartz(float(self.S), float(self.K), float(self.T), float(self.r), float(self.sigma),
+                                  float(self.option_type_sign()), paths, steps, seed,
+                                  degree=degree,
+                                  block_steps=block_steps,
+                                  alpha=alpha
+                                  )
@@ -0,0 +1,130 @@
+import numpy as np
+from scipy.special import ndtr
+from config import PayoffType
+
+BARRIER_PAYOFFS = [PayoffType.UP_AND_OUT.value, PayoffType.UP_AND_IN.value,
+                   PayoffType.DOWN_AND_OUT.value, PayoffType.DOWN_AND_IN.value]
+# continuous in the path, their delta can be taken path by path, the barriers need the likelihood ratio
+PATHWISE_PAYOFFS = [PayoffType.EUROPEAN.value, PayoffType.ASIAN_ARITHMETIC.value,
+                    PayoffType.ASIAN_GEOMETRIC.value, PayoffType.LOOKBACK.value]
+
+class PathStatistics:
+    # everything the path-dependent payoffs need, accumulated one time step at a time over a vector of paths
+    def __init__(self, S, scores=False):
+        self.steps = 0
+        self.terminal = S.copy()
+        self.arithmetic_sum = np.zeros_like(S)
+        self.log_sum = np.zeros_like(S)
+        # the barrier is also hit (and the extremes reached) at the start of the path
+        self.minimum = S.copy()
+        self.maximum = S.copy()
+        # the draws the likelihood ratio greeks are weighted with, only tracked when they are asked for
+        self.first_shock = None
+        self.shock_square_sum = np.zeros_like(S) if scores else None
+
+    def update(self, log_S):
+        S_t = np.exp(log_S, out=self.terminal)
+        self.steps += 1
+        self.arithmetic_sum += S_t
+        self.log_sum += log_S
+        np.minimum(self.minimum, S_t, out=self.minimum)
+        np.maximum(self.maximum, S_t, out=self.maximum)
+
+    def update_shocks(self, Z):
+        if self.first_shock is None:
+            self.first_shock = Z.copy()
+        self.shock_square_sum += Z**2
+
+    def arithmetic_average(self):
+        return self.arithmetic_sum / self.steps
+
+    def geometric_average(self):
+        return np.exp(self.log_sum / self.steps)
+
+def stream_path_statistics(S, T, r, sigma, paths, steps, random_state, sample_rows=None, scores=False):
+    """
+    Inputs: S, T, r, sigma (float), paths, steps (int), random_state (np.random.RandomState) the steps are drawn from,
+            sample_rows (np.ndarray) of the paths whose prices are recorded for plotting,
+            scores (bool) also track the draws the Monte Carlo greeks need
+    Outputs: (PathStatistics, np.ndarray) statistics of the paths averaged over the steps 1 ... steps (S excluded)
+             and the (len(sample_rows), steps + 1) sampled paths - only vectors of one time step are ever in memory
+    """
+    sample_rows = np.asarray([] if sample_rows is None else sample_rows, dtype=int)
+    dt = T / steps
+    drift = (r - 0.5 * sigma**2) * dt
+    volatility = sigma * np.sqrt(dt)
+
+    log_S = np.full(paths, np.log(S))
+    statistics = PathStatistics(np.full(paths, float(S)), scores=scores)
+    sample_paths = np.empty((len(sample_rows), steps + 1))
+    sample_paths[:, 0] = S
+
+    for step in range(1, steps + 1):
+        Z = random_state.standard_normal(paths)
+        log_S += drift + volatility * Z
+        statistics.update(log_S)
+        if scores:
+            statistics.update_shocks(Z)
+        sample_paths[:, step] = statistics.terminal[sample_rows]
+
+    return statistics, sample_paths
+
+def payoff_underlying(statistics, product, sign):
+    # the price the payoff of the product is on, all of them are proportional to S along every path
+    if product == PayoffType.EUROPEAN.value:
+        return statistics.terminal
+    if product == PayoffType.ASIAN_ARITHMETIC.value:
+        return statistics.arithmetic_average()
+    if product == PayoffType.ASIAN_GEOMETRIC.value:
+        return statistics.geometric_average()
+    if product == PayoffType.LOOKBACK.value:
+        # fixed strike - the best price the path reached against the strike
+        return np.where(sign > 0, statistics.maximum, statistics.minimum)
+    raise ValueError(f"'{product}' is not a function of a single price of the path")
+
+def geometric_asian_price(S, K, T, r, sigma, sign, steps):
+    # closed form of the geometric average over the steps 1 ... steps, its log is normal
+    dt = T / steps
+    mean = np.log(S) + (r - 0.5 * sigma**2) * dt * (steps + 1) / 2
+    variance = sigma**2 * dt * (steps + 1) * (2 * steps + 1) / (6 * steps)
+    d1 = (mean - np.log(K) + variance) / np.sqrt(variance)
+    d2 = d1 - np.sqrt(variance)
+    return np.exp(-r * T) * sign * (np.exp(mean + 0.5 * variance) * ndtr(sign * d1) - K * ndtr(sign * d2))
+
+def path_dependent_payoffs(statistics, product, K, T, r, sigma, sign, S, barrier=None, control_variate=True):
+    """
+    Inputs: statistics (PathStatistics), product (str) PayoffType, K, T, r, sigma, sign, S (float),
+            barrier (float) for the barrier payoffs, control_variate (bool) for the arithmetic Asian payoff
+    Outputs: (np.ndarray) discounted payoff of every path
+    """
+    discount = np.exp(-r * T)
+    vanilla = np.maximum(sign * (statistics.terminal - K), 0)
+
+    if product == PayoffType.ASIAN_ARITHMETIC.value:
+        payoffs = np.maximum(sign * (statistics.arithmetic_average() - K), 0)
+        if control_variate:
+            # the geometric average moves almost one to one with the arithmetic one, and its price is known exactly
+            # (Kemna-Vorst), only the difference between the two is simulated
+            geometric_payoffs = np.maximum(sign * (statistics.geometric_average() - K), 0)
+            exact = geometric_asian_price(S, K, T, r, sigma, sign, statistics.steps)
+            return discount * (payoffs - geometric_payoffs) + exact
+    elif product in PATHWISE_PAYOFFS:
+        payoffs = np.maximum(sign * (payoff_underlying(statistics, product, sign) - K), 0)
+    elif product in BARRIER_PAYOFFS:
+        if barrier is None:
+            raise ValueError(f"'{product}' needs a barrier")
+        up = product in [PayoffType.UP_AND_OUT.value, PayoffType.UP_AND_IN.value]
+        hit = statistics.maximum >= barrier if up else statistics.minimum <= barrier
+        knocked_in = hit if product in [PayoffType.UP_AND_IN.value, PayoffType.DOWN_AND_IN.value] else ~hit
+        payoffs = np.where(knocked_in, vanilla, 0.0)
+    else:
+        raise ValueError(f"Undefined payoff '{product}'")
+
+    return discount * payoffs
+
+def pathwise_payoffs(statistics, product, K, T, r, sign):
+    # discounted derivative of the payoff times the price it is on, None where the payoff jumps (the barriers)
+    if product not in PATHWISE_PAYOFFS:
+        return None
+    underlying = payoff_underlying(statistics, product, sign)
+    return np.exp(-r * T) * sign * underlying * (sign * (underlying - K) > 0)
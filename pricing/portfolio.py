@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from pricing.option_pricing import EuropeanOption
+from pricing.snapshot_pricing import years_to_expiry
+from pricing.volatility_surface import estimate_forwards
+from config import Greeks, OptionType, TRADING_YEAR_DAYS
+
+CONTRACT_SIZE = 100 # shares per listed equity option contract
+REVALUATION_CHUNK = 250_000 # scenarios x positions priced at once, bounds the memory of the full revaluation
+
+def log_price_kernel(S, K, T, r, sigma, option_type):
+    # the Black-Scholes terms that don't depend on the spot, the prices are then a function of log S only
+    alive = T > 0
+    T = np.where(alive, T, 1.0)
+    sigma_sqrt_T = sigma * np.sqrt(T)
+    return {
+        "is_put": (option_type == OptionType.PUT.value).astype(float),
+        "alive": alive,
+        "K": K,
+        "log_K_drift": np.log(K) - (r + 0.5 * sigma**2) * T,
+        "sigma_sqrt_T": sigma_sqrt_T,
+        "discounted_K": K * np.exp(-r * T)
+    }
+
+def kernel_prices(kernel, log_S):
+    # call prices, the puts follow from the put-call parity - two normal cdfs per price (they take most of the time)
+    S = np.exp(log_S)
+    d1 = (log_S - kernel["log_K_drift"]) / kernel["sigma_sqrt_T"]
+    discounted_K = kernel["discounted_K"]
+    prices = S * ndtr(d1) - discounted_K * ndtr(d1 - kernel["sigma_sqrt_T"]) + kernel["is_put"] * (discounted_K - S)
+
+    # positions that expire within the horizon are worth their payoff
+    if not kernel["alive"].all():
+        sign = 1 - 2 * kernel["is_put"]
+        prices = np.where(kernel["alive"], prices, np.maximum(sign * (S - kernel["K"]), 0))
+    return prices
+
+def revalue(S, K, T, r, sigma, option_type):
+    # Black-Scholes prices on any broadcast of the inputs, positions that expired within a scenario are worth their payoff
+    sign = np.where(option_type == OptionType.CALL.value, 1.0, -1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prices = EuropeanOption(S, K, np.maximum(T, 0), r, np.maximum(sigma, 1e-6), option_type).bs_price()
+    return np.where(T > 0, prices, np.maximum(sign * (S - K), 0))
+
+class Portfolio:
+    """
+    Inputs: tickers, S, K, T, sigma, option_type, quantity (np.ndarray) one entry per position - its underlying,
+            spot, strike, maturity, volatility, type and signed number of options (negative when short), r (float)
+    """
+    def __init__(self, tickers, S, K, T, r, sigma, option_type, quantity):
+        # scalars are shared by all the positions
+        arrays = np.broadcast_arrays(np.asarray(tickers).astype(str), np.asarray(S, dtype=float),
+                                     np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+                                     np.asarray(sigma, dtype=float), np.asarray(option_type),
+                                     np.asarray(quantity, dtype=float))
+        self.tickers, self.S, self.K, self.T, self.sigma, self.option_type, self.quantity = (
+            np.ravel(array) for array in arrays)
+        self.r = float(r)
+        # every position points to its underlying, the scenarios are drawn per underlying and not per position
+        self.underlyings, self.underlying_index = np.unique(self.tickers, return_inverse=True)
+
+    def __len__(self):
+        return len(self.quantity)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, quantities, r, spots=None):
+        """
+        Inputs: snapshot (pd.DataFrame) option snapshot rows (SnapshotIndex.frame or get_data_from_supabase),
+                quantities (dict or pd.Series) signed number of contracts by contract symbol, r (float),
+                spots (dict) price of every underlying - without it the spot is implied by the put-call parity forward
+                of the expiry (so the dividends don't have to be known)
+        Outputs: (Portfolio) the positions priced with the implied volatility of their quote
+        """
+        quantities = pd.Series(quantities, dtype=float)
+        snapshot = snapshot.assign(T=years_to_expiry(snapshot["expiry"], snapshot["snapshot_date"]))
+        positions = snapshot[snapshot["contractsymbol"].isin(quantities.index)]
+
+        missing = quantities.index.difference(positions["contractsymbol"])
+        if len(missing):
+            raise ValueError(f"Contracts missing from the snapshot: {list(missing)}")
+
+        if spots is not None:
+            S = positions["ticker"].map(spots).to_numpy(dtype=float)
+        else:
+            forwards = estimate_forwards(snapshot[snapshot["ticker"].isin(positions["ticker"])], r)
+            positions = positions.merge(forwards, on=["ticker", "expiry"], how="left")
+            S = (positions["forward"] * np.exp(-r * positions["T"])).to_numpy()
+        if np.isnan(S).any():
+            raise ValueError("No spot price for some of the underlyings")
+
+        return cls(tickers=positions["ticker"].to_numpy(),
+                   S=S,
+                   K=positions["strike"].to_numpy(dtype=float),
+                   T=positions["T"].to_numpy(),
+                   r=r,
+                   sigma=positions["impliedvolatility"].to_numpy(dtype=float),
+                   option_type=positions["option_type"].to_numpy(),
+                   quantity=quantities.loc[positions["contractsymbol"]].to_numpy() * CONTRACT_SIZE
+                   )
+
+    def value(self):
+        return float(self.quantity @ revalue(self.S, self.K, self.T, self.r, self.sigma, self.option_type))
+
+    def greeks(self):
+        # quantity weighted greeks of every underlying, their column sums are the greeks of the whole book
+        # (delta and gamma only add up within one underlying)
+        greeks = EuropeanOption(self.S, self.K, self.T, self.r, self.sigma, self.option_type).bs_greeks()
+        exposures = pd.DataFrame({greek.value: greeks[greek.value] * self.quantity for greek in Greeks})
+        return exposures.groupby(self.tickers).sum()
+
+    def scenario_grid(self, spot_shocks, vol_shocks, days):
+        """
+        Inputs: spot_shocks (np.ndarray) relative moves of every underlying, vol_shocks (np.ndarray) added to the
+                volatility of every position, days (np.ndarray) calendar days passed
+        Outputs: (np.ndarray) (spot, vol, days) grid of the full revaluation P&L of the portfolio
+        """
+        spot_shocks = np.asarray(spot_shocks, dtype=float)[:, None, None, None]
+        vol_shocks = np.asarray(vol_shocks, dtype=float)[None, :, None, None]
+        years = np.asarray(days, dtype=float)[None, None, :, None] / TRADING_YEAR_DAYS
+        base_value = self.value()
+
+        # the grid is broadcast against a chunk of positions at a time (positions are the last axis)
+        grid_size = spot_shocks.size * vol_shocks.size * years.size
+        chunk = max(1, REVALUATION_CHUNK // grid_size)
+        pnl = np.zeros(grid_size).reshape(spot_shocks.size, vol_shocks.size, years.size)
+        for start in range(0, len(self), chunk):
+            rows = slice(start, start + chunk)
+            prices = revalue(self.S[rows] * (1 + spot_shocks), self.K[rows], self.T[rows] - years, self.r,
+                             self.sigma[rows] + vol_shocks, self.option_type[rows])
+            pnl += prices @ self.quantity[rows]
+
+        return pnl - base_value
+
+    def monte_carlo_var(self, days, scenarios, seed, alpha=0.01, volatility=None, correlation=None):
+        """
+        Inputs: days (float) horizon, scenarios (int), seed (int), alpha (float) tail probability,
+                volatility (dict) of every underlying (the mean implied volatility of its positions by default),
+                correlation (np.ndarray) of the underlyings in the order of self.underlyings
+        Outputs: (dict) value at risk and expected shortfall (losses, positive numbers) and the P&L of every scenario,
+                 every scenario is a full revaluation, done in chunks of scenarios to bound the memory
+        """
+        horizon = days / TRADING_YEAR_DAYS
+        if volatility is None:
+            volatility = pd.Series(self.sigma).groupby(self.tickers).mean()
+        underlying_sigma = np.array([volatility[ticker] for ticker in self.underlyings], dtype=float)
+        cholesky = np.linalg.cholesky(np.eye(len(self.underlyings)) if correlation is None else np.asarray(correlation))
+
+        random_state = np.random.RandomState(seed)
+        base_value = self.value()
+        kernel = log_price_kernel(self.S, self.K, self.T - horizon, self.r, self.sigma, self.option_type)
+        log_S = np.log(self.S)
+        chunk = max(1, REVALUATION_CHUNK // len(self))
+        pnl = np.empty(int(scenarios))
+        for start in range(0, len(pnl), chunk):
+            n = min(chunk, len(pnl) - start)
+            # correlated log returns of the underlyings over the horizon, mapped onto their positions
+            Z = random_state.standard_normal((n, len(self.underlyings))) @ cholesky.T
+            returns = (self.r - 0.5 * underlying_sigma**2) * horizon + underlying_sigma * np.sqrt(horizon) * Z
+            pnl[start:start + n] = kernel_prices(kernel, log_S + returns[:, self.underlying_index]) @ self.quantity - base_value
+
+        value_at_risk = -np.quantile(pnl, alpha)
+        return {
+            "value_at_risk": value_at_risk,
+            "expected_shortfall": -pnl[pnl <= -value_at_risk].mean(),
+            "pnl": pnl
+        }
@@ -0,0 +1,7 @@
+def fetch_risk_free_rate():
+    # the yield of the short treasury ETF (SHY) - without any cache, so that the headless updater doesn't need streamlit
+    import yfinance as yf # imported on the first use, not on the app start
+
+    shy = yf.Ticker("SHY")
+    risk_free_rate = shy.info["dividendYield"] / 100
+    return risk_free_rate
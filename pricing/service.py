@@ -0,0 +1,275 @@
+import json
+import math
+import time
+import bisect
+import asyncio
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pricing.option_pricing import EuropeanOption
+from config import AppSettings, OptionType, VariableKey
+
+OPTION_FIELDS = [
+    VariableKey.S.value,
+    VariableKey.K.value,
+    VariableKey.T.value,
+    VariableKey.R.value,
+    VariableKey.SIGMA.value
+]
+MC_FIELDS = [VariableKey.PATHS.value, VariableKey.STEPS.value]
+
+# upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf")]
+
+# latency histograms are kept per known route, everything else shares one - the metrics can't be grown by requesting
+# arbitrary paths
+ROUTES = {("GET", "/health"), ("GET", "/metrics"), ("POST", "/price"), ("POST", "/monte-carlo")}
+UNMATCHED_ROUTE = "unmatched"
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+class RequestError(Exception):
+    pass
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        milliseconds = seconds * 1000
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+
+    def quantile(self, q):
+        # upper bound of the bucket the quantile falls into
+        if self.count == 0:
+            return None
+        position = np.searchsorted(np.cumsum(self.counts), q * self.count)
+        return LATENCY_BUCKETS_MS[position]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "buckets": {f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS_MS, self.counts)}
+        }
+
+def json_safe(value):
+    # NaN and infinities (e.g. a price outside of the model's range, or the open-ended latency bucket) aren't valid JSON,
+    # strict clients get null instead
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+def parse_option(payload):
+    try:
+        option = {field: float(payload[field]) for field in OPTION_FIELDS}
+        option_type = payload[VariableKey.OPTION_TYPE.value]
+    except (KeyError, TypeError, ValueError) as error:
+        raise RequestError(f"Invalid or missing option parameter: {error}")
+
+    if option_type not in (OptionType.CALL.value, OptionType.PUT.value):
+        raise RequestError(f"option_type must be '{OptionType.CALL.value}' or '{OptionType.PUT.value}'")
+    if min(option[VariableKey.S.value], option[VariableKey.K.value],
+           option[VariableKey.T.value], option[VariableKey.SIGMA.value]) <= 0:
+        raise RequestError("S, K, T and sigma have to be positive")
+
+    option[VariableKey.OPTION_TYPE.value] = option_type
+    return option
+
+def parse_monte_carlo(payload, config):
+    option = parse_option(payload)
+    try:
+        simulation = {field: int(payload[field]) for field in MC_FIELDS}
+        simulation["seed"] = int(payload.get("seed", 0))
+    except (KeyError, TypeError, ValueError) as error:
+        raise RequestError(f"Invalid or missing Monte Carlo parameter: {error}")
+
+    # the same limits as the inputs in the app
+    for field in MC_FIELDS:
+        input_config = config.STREAMLIT_INPUT_CONFIGS[field]
+        if not input_config.min <= simulation[field] <= input_config.max:
+            raise RequestError(f"{field} has to be between {input_config.min:.0f} and {input_config.max:.0f}")
+    return option, simulation
+
+def run_monte_carlo(option, simulation):
+    # runs in a worker process
+    output = EuropeanOption(**option).mc_model(**simulation)
+    return {
+        "price": float(output["price"]),
+        "confidence_interval": [float(bound) for bound in output["confidence_interval"]]
+    }
+
+class PricingService:
+    def __init__(self, batch_window, max_batch_size, mc_workers, config):
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.config = config
+        self.queue = asyncio.Queue()
+        self.mc_executor = ProcessPoolExecutor(max_workers=mc_workers)
+        self.latencies = {}
+        self.batches = 0
+        self.batched_requests = 0
+        self.max_seen_batch_size = 0
+        self.batcher = None
+
+    def start(self):
+        self.batcher = asyncio.create_task(self.run_batcher())
+
+    async def run_batcher(self):
+        # single requests arriving within the batch window are priced together in one vectorized call
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.price_batch(batch)
+
+    def price_batch(self, batch):
+        options, futures = zip(*batch)
+        self.batches += 1
+        self.batched_requests += len(batch)
+        self.max_seen_batch_size = max(self.max_seen_batch_size, len(batch))
+
+        try:
+            option = EuropeanOption(**{key: np.array([option[key] for option in options]) for key in options[0]})
+            prices = option.bs_price()
+            greeks = option.bs_greeks()
+        except Exception as error:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for i, future in enumerate(futures):
+            if not future.done():
+                future.set_result({
+                    "price": float(prices[i]),
+                    "greeks": {greek: float(values[i]) for greek, values in greeks.items()}
+                })
+
+    async def price(self, payload):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((parse_option(payload), future))
+        return await future
+
+    async def monte_carlo(self, payload):
+        option, simulation = parse_monte_carlo(payload, self.config)
+        return await asyncio.get_running_loop().run_in_executor(self.mc_executor, run_monte_carlo, option, simulation)
+
+    def metrics(self):
+        return {
+            "latency": {route: histogram.summary() for route, histogram in self.latencies.items()},
+            "batches": {
+                "count": self.batches,
+                "mean_size": self.batched_requests / self.batches if self.batches else None,
+                "max_size": self.max_seen_batch_size
+            }
+        }
+
+    async def route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics()
+
+        routes = {"/price": self.price, "/monte-carlo": self.monte_carlo}
+        if method != "POST" or path not in routes:
+            return 404, {"error": f"Unknown route {method} {path}"}
+
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            return 400, {"error": "Request body has to be JSON"}
+        if not isinstance(payload, dict):
+            return 400, {"error": "Request body has to be a JSON object"}
+
+        try:
+            return 200, await routes[path](payload)
+        except RequestError as error:
+            return 400, {"error": str(error)}
+
+    async def handle_connection(self, reader, writer):
+        # minimal HTTP/1.1 with keep-alive - enough for JSON requests without any web framework
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                start = time.perf_counter()
+                try:
+                    status, response = await self.route(method, path, body)
+                except Exception as error:
+                    status, response = 500, {"error": str(error)}
+                route = path if (method, path) in ROUTES else UNMATCHED_ROUTE
+                self.latencies.setdefault(route, LatencyHistogram()).observe(time.perf_counter() - start)
+
+                response_body = json.dumps(json_safe(response), allow_nan=False).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(response_body)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + response_body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host, port, batch_window, max_batch_size, mc_workers):
+    service = PricingService(batch_window=batch_window,
+                             max_batch_size=max_batch_size,
+                             mc_workers=mc_workers,
+                             config=AppSettings
+                             )
+    service.start()
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Pricing service listening on http://{host}:{port} (POST /price, POST /monte-carlo, GET /metrics)")
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pricing.service",
+                                     description="HTTP service for Black-Scholes prices, greeks and Monte Carlo.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--batch-window-ms", type=float, default=2.0,
+                        help="how long single requests are collected into one vectorized batch (default: 2 ms)")
+    parser.add_argument("--max-batch-size", type=int, default=4096)
+    parser.add_argument("--mc-workers", type=int, default=2, help="worker processes for Monte Carlo jobs")
+    args = parser.parse_args(argv)
+
+    asyncio.run(serve(host=args.host,
+                      port=args.port,
+                      batch_window=args.batch_window_ms / 1000,
+                      max_batch_size=args.max_batch_size,
+                      mc_workers=args.mc_workers
+                      ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import numpy as np
+
+SORT_COLUMNS = ["ticker", "option_type", "strike"]
+
+class SnapshotIndex:
+    def __init__(self, df):
+        # the whole snapshot is kept sorted, so every (ticker, option_type, strike) lookup is just a binary search
+        # over the key columns followed by a positional slice - no boolean masks over the full table
+        df = df.sort_values(SORT_COLUMNS, kind="stable").reset_index(drop=True)
+
+        self.frame = df
+        self.tickers_sorted = df["ticker"].to_numpy().astype(str)
+        self.option_types_sorted = df["option_type"].to_numpy().astype(str)
+        self.strikes_sorted = df["strike"].to_numpy(dtype=float)
+        self.tickers = np.unique(self.tickers_sorted).tolist()
+
+    def __len__(self):
+        return len(self.tickers_sorted)
+
+    def locate(self, ticker, option_type=None, strike_range=None):
+        start = np.searchsorted(self.tickers_sorted, ticker, side="left")
+        end = np.searchsorted(self.tickers_sorted, ticker, side="right")
+
+        if option_type is not None:
+            option_types = self.option_types_sorted[start:end]
+            start, end = (start + np.searchsorted(option_types, option_type, side="left"),
+                          start + np.searchsorted(option_types, option_type, side="right"))
+
+            # strikes are only sorted within a single (ticker, option_type) block
+            if strike_range is not None:
+                strikes = self.strikes_sorted[start:end]
+                start, end = (start + np.searchsorted(strikes, strike_range[0], side="left"),
+                              start + np.searchsorted(strikes, strike_range[1], side="right"))
+        elif strike_range is not None:
+            raise ValueError("strike_range can only be used together with an option_type")
+
+        return int(start), int(end)
+
+    def get_options(self, ticker, option_type=None, strike_range=None):
+        start, end = self.locate(ticker, option_type=option_type, strike_range=strike_range)
+        return self.frame.iloc[start:end].reset_index(drop=True)
+
+    def memory_usage(self):
+        key_arrays = [self.tickers_sorted, self.option_types_sorted, self.strikes_sorted]
+        return int(self.frame.memory_usage(deep=True).sum()) + sum(array.nbytes for array in key_arrays)
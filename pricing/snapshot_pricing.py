@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from pricing.option_pricing import EuropeanOption
+from config import Greeks, TRADING_YEAR_DAYS
+
+# the greek columns of the options_snapshot table, pinned instead of following the Greeks enum - a new greek would
+# otherwise be a new column in every row the nightly updater inserts, which the table doesn't have
+SNAPSHOT_GREEKS = [Greeks.DELTA, Greeks.GAMMA, Greeks.VEGA, Greeks.THETA, Greeks.RHO]
+GREEK_COLUMNS = [greek.value.lower() for greek in SNAPSHOT_GREEKS]
+MODEL_COLUMNS = ["model_price", "model_spread", *GREEK_COLUMNS]
+
+def years_to_expiry(expiry, snapshot_date):
+    # same convention as the rest of the app - calendar days scaled by the trading year
+    return (pd.to_datetime(expiry) - pd.to_datetime(snapshot_date)).dt.days.to_numpy() / TRADING_YEAR_DAYS
+
+def price_options(df, S, T, r, sigma):
+    """
+    Inputs: df (pd.DataFrame) with "strike", "option_type", "bid" and "ask" columns,
+            S, T, sigma (float or np.ndarray aligned with df), r (float)
+    Outputs: (pd.DataFrame) Black-Scholes price, spread to the market mid price and greeks for every row of df
+    """
+    option = EuropeanOption(S=S,
+                            K=df["strike"].to_numpy(dtype=float),
+                            T=T,
+                            r=r,
+                            sigma=sigma,
+                            option_type=df["option_type"].to_numpy()
+                            )
+
+    # expired contracts or tickers without a volatility end up as NaN instead of warnings
+    with np.errstate(divide="ignore", invalid="ignore"):
+        model_price = option.bs_price()
+        greeks = option.bs_greeks()
+
+    bid = df["bid"].to_numpy(dtype=float)
+    ask = df["ask"].to_numpy(dtype=float)
+    market_price = np.where(ask > 0, (bid + ask) / 2, np.nan) # no ask means no market to compare with
+
+    model_columns = pd.DataFrame({
+        "model_price": model_price,
+        "model_spread": model_price - market_price,
+        **{column: greeks[greek.value] for greek, column in zip(SNAPSHOT_GREEKS, GREEK_COLUMNS)}
+    }, index=df.index)
+
+    return model_columns
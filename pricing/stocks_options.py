@@ -1,36 +1,94 @@
 import pandas as pd
-import yfinance as yf
 import streamlit as st
 import numpy as np
-from datetime import datetime
-from config import OptionType, TRADING_YEAR_DAYS
+from datetime import datetime, timedelta
+from config import AppSettings, OptionType, VariableKey, TRADING_YEAR_DAYS
+from pricing.snapshot_index import SnapshotIndex
+from pricing.ohlcv_store import OHLCVStore
+from pricing.rates import fetch_risk_free_rate
+from pricing.snapshot_pricing import price_options, SNAPSHOT_GREEKS, MODEL_COLUMNS
+from pricing.option_pricing import EuropeanOption
+from src.utils import get_seed
+from src.profiling import profiled
 
-@st.cache_data
+@st.cache_resource
+def get_supabase_client(supabase_config):
+    # one client for all the sessions, created only once the first tab that reads the data is rendered
+    from supabase import create_client
+
+    return create_client(supabase_config.SUPABASE_URL, supabase_config.SUPABASE_READ_KEY)
+
+@st.cache_resource
+def get_ohlcv_store(config):
+    # shared by all the sessions, the candlestick plot and the historical volatility read the same bars
+    return OHLCVStore(root=config.OHLCV_CACHE_PATH, refresh_seconds=config.OHLCV_REFRESH_SECONDS)
+
+@profiled()
 def get_stock_data(selected_ticker, selected_interval, config):
-    df = yf.download(selected_ticker,
-                     interval=selected_interval,
-                     period=config.MAX_PERIODS[selected_interval]
-                     )
-    df = df.xs(selected_ticker, axis=1, level=1)
-    return df
+    return get_ohlcv_store(config).get(selected_ticker,
+                                       interval=selected_interval,
+                                       period=config.MAX_PERIODS[selected_interval],
+                                       config=config
+                                       )
 
+@profiled()
 @st.cache_data
 def get_tickers(_supabase_client):
     tickers = _supabase_client.rpc("get_unique_tickers").execute()
     return tickers.data
 
-def get_data_from_supabase(supabase_client, selected_ticker):
+@profiled()
+def get_data_from_supabase(supabase_client, selected_ticker, snapshot_index=None):
+    if snapshot_index is not None:
+        return snapshot_index.get_options(selected_ticker)
     options = supabase_client.rpc("get_options_by_ticker", {"ticker_text": selected_ticker}).execute()
     options_data = pd.DataFrame(options.data)
     return options_data
 
-def get_specific_data(df, option_type):
-    if option_type in (OptionType.CALL.value, OptionType.PUT.value):
-        df = df[df["option_type"] == option_type]
-    else:
+@profiled()
+@st.cache_resource(show_spinner="Loading the option snapshot...")
+def get_snapshot_index(_supabase_client, config):
+    # PostgREST caps the number of returned rows, so the whole table has to be read page by page - the order has to
+    # be unique (ticker, type and strike repeat for every expiry of the ladder, so the contract symbol breaks the ties),
+    # Postgres doesn't keep tied rows in the same order across requests and they could be skipped or duplicated
+    pages = []
+    start = 0
+    while True:
+        page = (_supabase_client.table(config.SNAPSHOT_TABLE)
+                .select("*")
+                .order("ticker")
+                .order("option_type")
+                .order("strike")
+                .order("contractSymbol")
+                .range(start, start + config.SNAPSHOT_PAGE_SIZE - 1)
+                .execute())
+        pages.extend(page.data)
+        if len(page.data) < config.SNAPSHOT_PAGE_SIZE:
+            break
+        start += config.SNAPSHOT_PAGE_SIZE
+
+    snapshot = pd.DataFrame(pages)
+    snapshot.columns = snapshot.columns.str.lower() # same column names as returned by "get_options_by_ticker"
+    return SnapshotIndex(snapshot)
+
+def get_closest_expiry(expiries, days_to_expiry=AppSettings.MODELLED_OPTIONS_EXPIRY_DAYS):
+    expirations = pd.to_datetime(pd.Series(expiries).unique())
+    target_date = pd.to_datetime(datetime.now() + timedelta(days=days_to_expiry))
+    closest_index = np.abs((expirations - target_date).total_seconds().to_numpy()).argmin()
+    return str(expirations[closest_index].date())
+
+def get_specific_data(df, option_type, snapshot_index=None, selected_ticker=None):
+    if option_type not in (OptionType.CALL.value, OptionType.PUT.value):
         raise ValueError("Please select one of the possible option types.")
+    if snapshot_index is not None:
+        # the (ticker, option_type) block of the preloaded snapshot is a slice, no mask over the expiry ladder
+        df = snapshot_index.get_options(selected_ticker, option_type=option_type)
+    else:
+        df = df[df["option_type"] == option_type]
     
-    closest_expiry = df.loc[df.index[0], "expiry"]
+    # the snapshot holds the whole expiry ladder, the table shows only the one closest to the modelled expiry
+    closest_expiry = get_closest_expiry(df["expiry"])
+    df = df[df["expiry"] == closest_expiry]
     df = df.loc[:, ["contractsymbol", "strike", "bid", "ask", "volume", "impliedvolatility"]]
     df.columns = ["Contract symbol", "Strike price (K)", "Bid", "Ask", "Volume", "Implied volatility (IV)"]
     df = df.set_index("Contract symbol")
@@ -39,6 +97,72 @@ def get_specific_data(df, option_type):
     closest_expiry = datetime.strftime(closest_expiry, "%d.%m.%Y")
     return df, closest_expiry
 
+CHAIN_MODEL_COLUMNS = {
+    "model_price": "Model price (BS)",
+    "model_spread": "Model - market",
+    **{greek.value.lower(): greek.value for greek in SNAPSHOT_GREEKS}
+}
+
+@profiled()
+def get_stored_chain_model_prices(raw_options_data, options_data, option_type, model_inputs):
+    """
+    Inputs: raw_options_data (pd.DataFrame) snapshot rows of the ticker, options_data (pd.DataFrame) the chain of
+            get_specific_data, option_type (str), model_inputs (dict) S, T, r and sigma of the chain
+    Outputs: (pd.DataFrame or None) the model columns the nightly updater stored with the snapshot (add_model_columns).
+             They only hold for the ingest inputs - the stored underlying price and historical volatility, the maturity
+             from the snapshot date and the rate of the ingest day - otherwise (or for older snapshots without them)
+             it's None and the chain is repriced by get_chain_model_prices
+    """
+    stored_columns = [*MODEL_COLUMNS, "underlying_price", "historical_volatility"]
+    if not set(stored_columns).issubset(raw_options_data.columns):
+        return None
+
+    rows = raw_options_data[raw_options_data["option_type"] == option_type].set_index("contractsymbol")
+    rows = rows.reindex(options_data.index)
+    if rows["model_price"].isna().any():
+        return None
+    if (model_inputs[VariableKey.S.value] != rows["underlying_price"].iloc[0]
+            or model_inputs[VariableKey.SIGMA.value] != rows["historical_volatility"].iloc[0]):
+        return None
+
+    # the rate isn't stored, the most expensive contract (the most sensitive to it) is repriced to check it and the
+    # maturity against the ingest
+    check_row = rows.loc[rows["model_price"].idxmax()]
+    check_price = EuropeanOption(K=float(check_row["strike"]), option_type=option_type, **model_inputs).bs_price()
+    if not np.isclose(check_price, check_row["model_price"], rtol=1e-6, atol=1e-8):
+        return None
+
+    return rows[MODEL_COLUMNS].rename(columns=CHAIN_MODEL_COLUMNS)
+
+@profiled()
+@st.cache_data(max_entries=256)
+def get_chain_model_prices(_options_data, selected_ticker, option_type, snapshot_date, model_inputs):
+    # one vectorized pricing call for every strike of the chain - the chain itself isn't hashed,
+    # it's identified by the (ticker, option type, snapshot) key
+    chain = pd.DataFrame({
+        "strike": _options_data["Strike price (K)"],
+        "option_type": option_type,
+        "bid": _options_data["Bid"],
+        "ask": _options_data["Ask"]
+    })
+    return price_options(chain, **model_inputs).rename(columns=CHAIN_MODEL_COLUMNS)
+
+@profiled()
+@st.cache_data(max_entries=256)
+def get_chain_mc_prices(_options_data, selected_ticker, option_type, snapshot_date, model_inputs, config):
+    # one simulation of the underlying for the whole chain, every strike is evaluated against the same paths,
+    # so the chain costs about as much as a single option and the prices are smooth across the strikes
+    chain_option = EuropeanOption(K=_options_data["Strike price (K)"].to_numpy(dtype=float),
+                                  option_type=option_type,
+                                  **model_inputs
+                                  )
+    mc_output = chain_option.mc_model(paths=config.CHAIN_MC_PATHS,
+                                      steps=config.CHAIN_MC_STEPS,
+                                      seed=get_seed(seed_interval=config.SEED_INTERVAL),
+                                      include_ci=False
+                                      )
+    return pd.Series(mc_output["price"], index=_options_data.index, name="Model price (MC)")
+
 def data_older_than_yesterday(df):
     data_input_date = df["snapshot_date"][0]
     data_input_date = datetime.strptime(data_input_date, "%Y-%m-%d")
@@ -48,19 +172,43 @@ def data_older_than_yesterday(df):
         return data_input_date_regionalized
     return None
 
-@st.cache_data
+@profiled()
 def calculate_historical_volatility(selected_ticker, config):
-    df = yf.download(selected_ticker,
-                     interval=config.HV_INTERVAL,
-                     period=config.HV_PERIOD
-                     )
-    df = df.xs(selected_ticker, axis=1, level=1)
+    df = get_ohlcv_store(config).get(selected_ticker,
+                                     interval=config.HV_INTERVAL,
+                                     period=config.HV_PERIOD,
+                                     config=config
+                                     )
     historical_volatility = np.log(df["Close"] / df["Close"].shift(1)).std() * np.sqrt(TRADING_YEAR_DAYS)
 
     return historical_volatility
 
+@profiled()
+def get_underlying_price(raw_options_data, selected_ticker, config):
+    # the close the nightly updater priced the snapshot with (daily bars, like the historical volatility), so the
+    # request path doesn't download anything - the bar store is only read for older snapshots without it
+    if "underlying_price" in raw_options_data.columns:
+        underlying_price = raw_options_data["underlying_price"].dropna()
+        if not underlying_price.empty:
+            return float(underlying_price.iloc[0])
+
+    df = get_ohlcv_store(config).get(selected_ticker,
+                                     interval=config.HV_INTERVAL,
+                                     period=config.HV_PERIOD,
+                                     config=config
+                                     )
+    return float(df["Close"].iloc[-1])
+
+@profiled()
+def get_historical_volatility(raw_options_data, selected_ticker, config):
+    # precomputed for every ticker by the nightly updater, calculated on the fly only for older snapshots
+    if "historical_volatility" in raw_options_data.columns:
+        historical_volatility = raw_options_data["historical_volatility"].dropna()
+        if not historical_volatility.empty:
+            return float(historical_volatility.iloc[0])
+    return calculate_historical_volatility(selected_ticker=selected_ticker, config=config)
+
+@profiled()
 @st.cache_data
 def get_risk_free_rate():
-    shy = yf.Ticker("SHY")
-    risk_free_rate = shy.info["dividendYield"] / 100
-    return risk_free_rate
+    return fetch_risk_free_rate()
@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from config import OptionType, TRADING_YEAR_DAYS
+
+MIN_SMILE_POINTS = 5 # an SVI slice has 5 parameters
+SVI_ITERATIONS = 100
+IV_BOUNDS = (0.01, 5.0) # quotes outside of these are usually placeholders for options without a market
+
+def svi_total_variance(k, params):
+    # raw SVI parameterization: w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + s^2))
+    a, b, rho, m, s = (params[..., i, None] for i in range(5))
+    x = k - m
+    return a + b * (rho * x + np.sqrt(x**2 + s**2))
+
+def svi_jacobian(k, params):
+    a, b, rho, m, s = (params[..., i, None] for i in range(5))
+    x = k - m
+    root = np.sqrt(x**2 + s**2)
+    return np.stack([
+        np.ones_like(x),
+        rho * x + root,
+        b * x,
+        -b * (rho + x / root),
+        b * s / root
+    ], axis=-1)
+
+def constrain_svi(params):
+    params = params.copy()
+    params[:, 1] = np.maximum(params[:, 1], 1e-6)
+    params[:, 2] = np.clip(params[:, 2], -0.999, 0.999)
+    params[:, 4] = np.maximum(params[:, 4], 1e-4)
+    # the minimum of the slice (a + b * s * sqrt(1 - rho^2)) can't be a negative variance
+    min_variance = params[:, 0] + params[:, 1] * params[:, 4] * np.sqrt(1 - params[:, 2]**2)
+    params[:, 0] += np.maximum(-min_variance, 0)
+    return params
+
+def fit_svi(k, w, mask, iterations=SVI_ITERATIONS):
+    """
+    Inputs: k, w (np.ndarray) padded (smiles, points) matrices of log-moneyness and total variance, mask (np.ndarray) of valid points
+    Outputs: (np.ndarray) (smiles, 5) raw SVI parameters, all the smiles are fitted at once (batched Levenberg-Marquardt)
+    """
+    k = np.where(mask, k, 0.0)
+    w = np.where(mask, w, 0.0)
+    n_points = mask.sum(axis=1)
+
+    w_min = np.where(mask, w, np.inf).min(axis=1)
+    k_at_min = np.take_along_axis(k, np.where(mask, w, np.inf).argmin(axis=1)[:, None], axis=1)[:, 0]
+    params = constrain_svi(np.column_stack([
+        w_min * 0.9,
+        np.full(len(k), 0.1),
+        np.full(len(k), -0.3),
+        k_at_min,
+        np.full(len(k), 0.1)
+    ]))
+
+    def cost(params, rows):
+        return (((svi_total_variance(k[rows], params) - w[rows]) * mask[rows])**2).sum(axis=1)
+
+    all_rows = np.arange(len(k))
+    damping = np.full(len(k), 1e-3)
+    current_cost = cost(params, all_rows)
+    identity = np.eye(5)
+
+    # smiles drop out of the batch once they stop improving, most of them converge in a few iterations
+    active = all_rows
+    for _ in range(iterations):
+        if len(active) == 0:
+            break
+
+        residuals = (svi_total_variance(k[active], params[active]) - w[active]) * mask[active]
+        jacobian = svi_jacobian(k[active], params[active]) * mask[active][..., None]
+        jtj = jacobian.transpose(0, 2, 1) @ jacobian
+        jtr = (jacobian.transpose(0, 2, 1) @ residuals[..., None])[..., 0]
+
+        system = jtj + damping[active, None, None] * (jtj * identity) + 1e-12 * identity
+        step = np.linalg.solve(system, -jtr[..., None])[..., 0]
+        candidate = constrain_svi(params[active] + step)
+        candidate_cost = cost(candidate, active)
+
+        improved = candidate_cost < current_cost[active]
+        relative_gain = (current_cost[active] - candidate_cost) / np.maximum(current_cost[active], 1e-300)
+        params[active] = np.where(improved[:, None], candidate, params[active])
+        current_cost[active] = np.where(improved, candidate_cost, current_cost[active])
+        damping[active] = np.clip(np.where(improved, damping[active] * 0.3, damping[active] * 10), 1e-9, 1e9)
+
+        converged = np.where(improved, relative_gain < 1e-10, damping[active] >= 1e6)
+        active = active[~converged]
+
+    rmse = np.sqrt(current_cost / np.maximum(n_points, 1))
+    return params, rmse
+
+def estimate_forwards(df, r):
+    # put-call parity at the strike where the call and put prices are the closest: F = K + e^(rT) * (C - P)
+    mid = (df["bid"] + df["ask"]) / 2
+    quotes = df.assign(mid=mid)[mid > 0]
+    calls = quotes[quotes["option_type"] == OptionType.CALL.value]
+    puts = quotes[quotes["option_type"] == OptionType.PUT.value]
+    pairs = calls.merge(puts, on=["ticker", "expiry", "strike", "T"], suffixes=("_call", "_put"))
+
+    pairs["difference"] = pairs["mid_call"] - pairs["mid_put"]
+    closest = pairs.loc[pairs["difference"].abs().groupby([pairs["ticker"], pairs["expiry"]]).idxmin()]
+    closest = closest.assign(forward=closest["strike"] + np.exp(r * closest["T"]) * closest["difference"])
+    return closest[["ticker", "expiry", "forward"]]
+
+def prepare_smiles(df, r):
+    df = df.copy()
+    df["T"] = (pd.to_datetime(df["expiry"]) - pd.to_datetime(df["snapshot_date"])).dt.days / TRADING_YEAR_DAYS
+    df = df[df["T"] > 0]
+
+    df = df.merge(estimate_forwards(df, r), on=["ticker", "expiry"])
+    df = df[df["forward"] > 0]
+    df["k"] = np.log(df["strike"] / df["forward"])
+
+    # out-of-the-money quotes only - they are the liquid side of each strike
+    out_of_the_money = np.where(df["option_type"] == OptionType.CALL.value, df["k"] >= 0, df["k"] < 0)
+    valid_iv = df["impliedvolatility"].between(*IV_BOUNDS)
+    df = df[out_of_the_money & valid_iv & (df["bid"] > 0)]
+    df["w"] = df["impliedvolatility"]**2 * df["T"]
+
+    df = df[df.groupby(["ticker", "expiry"])["k"].transform("size") >= MIN_SMILE_POINTS]
+    return df.sort_values(["ticker", "T", "k"])
+
+def pad_smiles(smiles):
+    # one row per (ticker, expiry) smile, padded to the longest one, so that all of them can be fitted together
+    smile_index = smiles.groupby(["ticker", "expiry"], sort=False).ngroup().to_numpy()
+    point_index = smiles.groupby(["ticker", "expiry"], sort=False).cumcount().to_numpy()
+    shape = (smile_index.max() + 1, point_index.max() + 1)
+
+    k = np.zeros(shape)
+    w = np.zeros(shape)
+    mask = np.zeros(shape, dtype=bool)
+    k[smile_index, point_index] = smiles["k"].to_numpy()
+    w[smile_index, point_index] = smiles["w"].to_numpy()
+    mask[smile_index, point_index] = True
+
+    keys = smiles.groupby(["ticker", "expiry"], sort=False)[["T", "forward"]].first().reset_index()
+    return keys, k, w, mask
+
+class VolatilitySurface:
+    def __init__(self, maturities, forwards, params):
+        order = np.argsort(maturities)
+        self.maturities = np.asarray(maturities, dtype=float)[order]
+        self.log_forwards = np.log(np.asarray(forwards, dtype=float)[order])
+        self.params = np.asarray(params, dtype=float)[order]
+        self.cached_sigma = lru_cache(maxsize=4096)(self.sigma_scalar)
+
+    def total_variance(self, K, T):
+        K, T = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float))
+        k = np.log(K) - np.interp(T, self.maturities, self.log_forwards)
+
+        # linear interpolation in total variance between the neighbouring expiries (at the same log-moneyness),
+        # outside of the fitted maturities the implied volatility of the closest slice is kept
+        if len(self.maturities) > 1:
+            upper = np.clip(np.searchsorted(self.maturities, T), 1, len(self.maturities) - 1)
+        else:
+            upper = np.zeros(T.shape, dtype=int)
+        lower = np.maximum(upper - 1, 0)
+        w_lower = svi_total_variance(k[..., None], self.params[lower])[..., 0]
+        w_upper = svi_total_variance(k[..., None], self.params[upper])[..., 0]
+
+        T_lower, T_upper = self.maturities[lower], self.maturities[upper]
+        weight = np.divide(T - T_lower, T_upper - T_lower, out=np.zeros(T.shape), where=T_upper > T_lower)
+        w = w_lower + (w_upper - w_lower) * weight
+
+        w = np.where(T < self.maturities[0], w_lower * T / self.maturities[0], w)
+        w = np.where(T > self.maturities[-1], w_upper * T / self.maturities[-1], w)
+        return np.maximum(w, 0)
+
+    def sigma_scalar(self, K, T):
+        return float(np.sqrt(self.total_variance(K, T) / T))
+
+    def sigma(self, K, T):
+        if np.ndim(K) == 0 and np.ndim(T) == 0:
+            return self.cached_sigma(float(K), float(T))
+        return np.sqrt(self.total_variance(K, T) / np.asarray(T, dtype=float))
+
+    def __call__(self, K, T):
+        return self.sigma(K, T)
+
+def build_volatility_surfaces(df, r):
+    """
+    Inputs: df (pd.DataFrame) snapshot rows (any number of tickers and expiries), r (float) risk-free rate
+    Outputs: (dict) ticker -> VolatilitySurface
+    """
+    smiles = prepare_smiles(df, r)
+    if smiles.empty:
+        return {}
+
+    keys, k, w, mask = pad_smiles(smiles)
+    params, _ = fit_svi(k, w, mask)
+
+    surfaces = {}
+    for ticker, indexes in keys.groupby("ticker").indices.items():
+        surfaces[ticker] = VolatilitySurface(maturities=keys["T"].to_numpy()[indexes],
+                                             forwards=keys["forward"].to_numpy()[indexes],
+                                             params=params[indexes]
+                                             )
+    return surfaces
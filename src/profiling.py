@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import time
+import types
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager, nullcontext
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from config import AppSettings
+
+# every session reruns the script in its own thread, so the profile of the running rerun is thread local
+active = threading.local()
+
+class RerunProfile:
+    def __init__(self, scope="app"):
+        self.scope = scope # "app" for a full rerun, otherwise the name of the rerunning fragment
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.depth = 0
+
+    @contextmanager
+    def span(self, name):
+        record = {"name": name, "depth": self.depth, "start_ms": (time.perf_counter() - self.start) * 1000}
+        self.spans.append(record)
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["duration_ms"] = (time.perf_counter() - start) * 1000
+            self.depth -= 1
+
+    def to_record(self):
+        ctx = get_script_run_ctx()
+        return {
+            "timestamp": pd.Timestamp(self.timestamp, unit="s", tz="UTC").isoformat(),
+            "session_id": ctx.session_id if ctx is not None else None,
+            "scope": self.scope,
+            "total_ms": (time.perf_counter() - self.start) * 1000,
+            "spans": self.spans
+        }
+
+def span(name):
+    profile = getattr(active, "profile", None)
+    return profile.span(name) if profile is not None else nullcontext()
+
+def profiled(name=None, fragment=False):
+    # functions are only wrapped when profiling is enabled, otherwise they are returned untouched (no overhead)
+    def decorator(function):
+        if not AppSettings.PROFILING:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            # a fragment that reruns on its own (outside of a full rerun) is profiled as a rerun of its own
+            if fragment and getattr(active, "profile", None) is None:
+                start_rerun(AppSettings, scope=name or function.__name__)
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    finish_rerun(AppSettings)
+
+            with span(name or function.__name__):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def deep_sizeof(obj, seen=None):
+    # bytes held by an object and everything it references (numpy buffers included), shared objects count once
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, np.ndarray):
+        # the buffer of a view belongs to its base, getsizeof only includes it for the arrays that own it
+        return size + (obj.nbytes if obj.base is not None else 0)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+def session_state_bytes():
+    """
+    Outputs: (dict) approximate memory held by every key of the session state of the running session
+    """
+    return {key: deep_sizeof(value) for key, value in st.session_state.to_dict().items()}
+
+def start_rerun(config, scope="app"):
+    if config.PROFILING:
+        active.profile = RerunProfile(scope=scope)
+
+def write_profile_log(record, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as file:
+        file.write(json.dumps(record) + "\n")
+
+def render_profiling_panel(record, history):
+    with st.sidebar:
+        st.subheader("Rerun timings")
+        st.write(f"Last full rerun: {record['total_ms']:.0f} ms")
+
+        spans = pd.DataFrame(record["spans"], columns=["name", "depth", "start_ms", "duration_ms"])
+        spans["name"] = spans["depth"].map(lambda depth: "· " * depth) + spans["name"] # indented by the nesting of the spans
+        st.dataframe(spans[["name", "start_ms", "duration_ms"]].style.format(precision=1),
+                     hide_index=True,
+                     use_container_width=True
+                     )
+
+        session_bytes = pd.Series(record["session_state_bytes"], dtype=float).sort_values(ascending=False)
+        st.write(f"Session state: {session_bytes.sum() / 1024:.0f} kB")
+        st.dataframe((session_bytes / 1024).rename("kB").head(5).to_frame().style.format(precision=1),
+                     use_container_width=True
+                     )
+
+        st.write("Previous reruns (ms)")
+        reruns = pd.DataFrame([{"scope": past["scope"], "total_ms": past["total_ms"]} for past in history])
+        st.bar_chart(reruns.reset_index(), x="index", y="total_ms", color="scope", height=150)
+
+def finish_rerun(config):
+    profile = getattr(active, "profile", None)
+    if profile is None:
+        return
+    active.profile = None
+
+    record = profile.to_record()
+    record["session_state_bytes"] = session_state_bytes()
+    write_profile_log(record, config.PROFILING_LOG_PATH)
+
+    history = st.session_state.setdefault("profiling_history", deque(maxlen=config.PROFILING_HISTORY))
+    history.append(record)
+    # the panel lives outside of the fragments, it's redrawn with the next full rerun
+    if config.PROFILING_PANEL and profile.scope == "app":
+        render_profiling_panel(record, history)
@@ -0,0 +1,98 @@
+import os
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+PARTITIONING = ds.partitioning(pa.schema([("snapshot_date", pa.string()), ("ticker", pa.string())]), flavor="hive")
+
+# compact on-disk types - prices and volatilities don't need float64
+ARCHIVE_SCHEMA = pa.schema([
+    ("contractSymbol", pa.string()),
+    ("ticker", pa.string()),
+    ("option_type", pa.string()),
+    ("strike", pa.float32()),
+    ("expiry", pa.string()),
+    ("bid", pa.float32()),
+    ("ask", pa.float32()),
+    ("volume", pa.uint32()),
+    ("impliedVolatility", pa.float32()),
+    ("historical_volatility", pa.float32()),
+    ("underlying_price", pa.float32()),
+    ("snapshot_date", pa.string()),
+])
+
+# the symbols are dictionary encoded by the parquet writer (per file) and read back as dictionaries as well,
+# so they end up as pandas categoricals instead of one python string per row
+DICTIONARY_COLUMNS = ["contractSymbol", "option_type", "expiry"]
+READ_SCHEMA = pa.schema([
+    pa.field(field.name, pa.dictionary(pa.int32(), pa.string())) if field.name in DICTIONARY_COLUMNS else field
+    for field in ARCHIVE_SCHEMA
+])
+
+def append_to_archive(df, archive_path):
+    df = df[ARCHIVE_SCHEMA.names].astype({"volume": "uint32"})
+    table = pa.Table.from_pandas(df, schema=ARCHIVE_SCHEMA, preserve_index=False).replace_schema_metadata(None)
+
+    # every run writes its own snapshot_date partitions, re-running on the same day replaces that day
+    ds.write_dataset(table,
+                     base_dir=archive_path,
+                     format="parquet",
+                     partitioning=PARTITIONING,
+                     basename_template="part-{i}.parquet",
+                     existing_data_behavior="delete_matching",
+                     file_options=ds.ParquetFileFormat().make_write_options(compression="zstd")
+                     )
+    print(f"Archived {len(df)} rows to '{archive_path}'.")
+
+def get_archive_files(archive_path, ticker=None, start_date=None, end_date=None):
+    # partition pruning is done on the directory names directly, so a single ticker history only touches
+    # its own files instead of discovering (and listing) the whole archive
+    # an archive that was never written (fresh checkout, or a cache miss of the workflow) has no files yet
+    if not os.path.isdir(archive_path):
+        return []
+
+    files = []
+    for date_directory in sorted(os.listdir(archive_path)):
+        snapshot_date = date_directory.removeprefix("snapshot_date=")
+        if start_date and snapshot_date < start_date or end_date and snapshot_date > end_date:
+            continue
+
+        date_path = os.path.join(archive_path, date_directory)
+        ticker_directories = [f"ticker={ticker}"] if ticker else sorted(os.listdir(date_path))
+        for ticker_directory in ticker_directories:
+            ticker_path = os.path.join(date_path, ticker_directory)
+            if os.path.isdir(ticker_path):
+                files.extend(os.path.join(ticker_path, name) for name in sorted(os.listdir(ticker_path)))
+    return files
+
+def read_archive(archive_path, ticker=None, contract_symbol=None, option_type=None,
+                 start_date=None, end_date=None, columns=None):
+    """
+    Inputs: dates (str) in the "YYYY-MM-DD" format of the snapshot_date partitions, all filters are optional
+    Outputs: (pd.DataFrame) archived snapshot rows sorted by snapshot_date
+    """
+    files = get_archive_files(archive_path, ticker=ticker, start_date=start_date, end_date=end_date)
+    if not files:
+        return READ_SCHEMA.empty_table().to_pandas()[columns or READ_SCHEMA.names]
+
+    # with an explicit schema the files don't have to be opened just to infer it
+    dataset = ds.dataset(files,
+                         schema=READ_SCHEMA,
+                         format=ds.ParquetFileFormat(read_options={"dictionary_columns": DICTIONARY_COLUMNS}),
+                         partitioning=PARTITIONING,
+                         partition_base_dir=archive_path,
+                         filesystem=pafs.LocalFileSystem(use_mmap=True)
+                         )
+
+    # the remaining filters are pushed down to the parquet reader (row group statistics)
+    row_filter = None
+    for column, value in (("contractSymbol", contract_symbol), ("option_type", option_type)):
+        if value is not None:
+            condition = ds.field(column) == value
+            row_filter = condition if row_filter is None else row_filter & condition
+
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    df = table.to_pandas()
+    if "snapshot_date" in df.columns:
+        df = df.sort_values("snapshot_date", kind="stable").reset_index(drop=True)
+    return df
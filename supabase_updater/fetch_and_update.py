@@ -1,28 +1,25 @@
 import yfinance as yf
 import pandas as pd
 import os
+import time
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from supabase import create_client
-from datetime import datetime, timedelta, timezone
-from config import AppSettings, OptionType
+from datetime import datetime, timezone
+from config import AppSettings, OptionType, TRADING_YEAR_DAYS
+from supabase_updater.archive import append_to_archive
+from pricing.snapshot_pricing import price_options, years_to_expiry
+from pricing.rates import fetch_risk_free_rate
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-print("Supabase client initialized.")
+OPTIONS_ARCHIVE_PATH = os.getenv("OPTIONS_ARCHIVE_PATH", AppSettings.OPTIONS_ARCHIVE_PATH)
 
 def get_possible_sp500_tickers():
     url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
     tickers = pd.read_html(url)[0]["Symbol"].str.replace(".", "-", regex=False).to_list()
     return tickers
 
-def get_closest_expiry(expirations, days_to_expiry=AppSettings.MODELLED_OPTIONS_EXPIRY_DAYS):
-    target_date = pd.to_datetime(datetime.now() + timedelta(days=days_to_expiry))
-    closest_index = np.abs((expirations - target_date).total_seconds().to_numpy()).argmin()
-    closest = str(expirations[closest_index].date())
-    print(f"Closest expiry found: {closest}")
-    return closest
-
 def fetch_option_data(yf_ticker, ticker, expiry):
     chain = yf_ticker.option_chain(expiry)
     calls = chain.calls
@@ -50,13 +47,54 @@ def fetch_option_data(yf_ticker, ticker, expiry):
     print(f"Formatted option data for {ticker} with {len(df)} rows.")
     return df
 
-def upload_to_supabase(df, table_name="options_snapshot"):
+def fetch_expiry_ladder(yf_ticker, ticker, expirations):
+    # every expiry is a separate (network bound) request, so the whole ladder of a ticker is fetched concurrently
+    expiries = [str(expiry.date()) for expiry in expirations]
+    with ThreadPoolExecutor(max_workers=AppSettings.EXPIRY_FETCH_WORKERS) as executor:
+        chains = list(executor.map(lambda expiry: fetch_option_data(yf_ticker, ticker, expiry), expiries))
+    print(f"Fetched {len(expiries)} expiries for {ticker}.")
+    return pd.concat(chains, ignore_index=True)
+
+def download_closes(tickers, interval=AppSettings.HV_INTERVAL, period=AppSettings.HV_PERIOD):
+    # a single multi-ticker download, returns a (dates x tickers) matrix of closing prices
+    print(f"Downloading {period} of closing prices for {len(tickers)} tickers...")
+    return yf.download(tickers, interval=interval, period=period, progress=False)["Close"]
+
+def calculate_historical_volatilities(closes):
+    # one vectorized pass over all the tickers (columns)
+    log_returns = np.log(closes / closes.shift(1))
+    historical_volatilities = log_returns.std() * np.sqrt(TRADING_YEAR_DAYS)
+    print(f"Historical volatility calculated for {historical_volatilities.notna().sum()} tickers.")
+    return historical_volatilities
+
+def add_model_columns(df, risk_free_rate):
+    # Black-Scholes (historical volatility) price, greeks and the spread to the market for every row at once,
+    # so the app doesn't have to price anything just to browse or sort the chains
+    start = time.perf_counter()
+    model_columns = price_options(df,
+                                  S=df["underlying_price"].to_numpy(dtype=float),
+                                  T=years_to_expiry(df["expiry"], df["snapshot_date"]),
+                                  r=risk_free_rate,
+                                  sigma=df["historical_volatility"].to_numpy(dtype=float)
+                                  )
+    elapsed = time.perf_counter() - start
+    print(f"Priced {len(df)} rows in {elapsed:.2f} s ({len(df) / max(elapsed, 1e-9):,.0f} rows/s).")
+    return pd.concat([df, model_columns], axis=1)
+
+def upload_to_supabase(df, table_name="options_snapshot", batch_size=AppSettings.UPLOAD_BATCH_SIZE):
     print(f"Uploading {len(df)} rows to Supabase table '{table_name}'...")
-    records = df.to_dict(orient="records")
-    supabase.table(table_name).insert(records).execute()
+    # missing values (e.g. tickers without a historical volatility) have to be sent as nulls, NaN isn't valid JSON
+    df = df.astype(object).where(df.notna(), None)
+    # the full ladder is too large for a single insert request
+    for start in range(0, len(df), batch_size):
+        records = df.iloc[start:start + batch_size].to_dict(orient="records")
+        supabase.table(table_name).insert(records).execute()
     print("Upload to Supabase complete.")
 
 if __name__ == "__main__":
+    supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    print("Supabase client initialized.")
+
     print("=== OPTIONS SNAPSHOT START ===")
     tickers = get_possible_sp500_tickers()
     all_options_df = pd.DataFrame()
@@ -69,8 +107,7 @@ if __name__ == "__main__":
             if len(expirations) == 0:
                 print(f"No expirations available for {ticker}. Skipping.")
                 continue
-            expiry = get_closest_expiry(expirations)
-            df = fetch_option_data(yf_ticker, ticker, expiry)
+            df = fetch_expiry_ladder(yf_ticker, ticker, expirations)
             all_options_df = pd.concat([all_options_df, df], ignore_index=True)
             if ticker == "AAPL" and df["ask"].sum() == 0:
                 # hardcoded "AAPL" because of it's reliability, no options will ever cost 0 in total
@@ -81,8 +118,13 @@ if __name__ == "__main__":
 
     print(f"\nTotal options rows collected: {len(all_options_df)}")
     if not all_options_df.empty:
+        closes = download_closes(all_options_df["ticker"].unique().tolist())
+        all_options_df["historical_volatility"] = all_options_df["ticker"].map(calculate_historical_volatilities(closes))
+        all_options_df["underlying_price"] = all_options_df["ticker"].map(closes.ffill().iloc[-1])
+        all_options_df = add_model_columns(all_options_df, risk_free_rate=fetch_risk_free_rate())
         supabase.table("options_snapshot").delete().neq("ticker", "").execute()
         upload_to_supabase(all_options_df)
+        append_to_archive(all_options_df, OPTIONS_ARCHIVE_PATH)
     else:
         print("No data to upload.")
     print("=== OPTIONS SNAPSHOT COMPLETE ===")
\ No newline at end of file
@@ -0,0 +1,23 @@
+import pandas as pd
+from pricing.batch import price_file
+
+def test_mixed_integer_and_float_chunks(tmp_path):
+    # the first chunk only has integer strikes and spots, the second one fractional ones
+    input_path = tmp_path / "options.csv"
+    output_path = tmp_path / "priced.parquet"
+    pd.DataFrame({
+        "S": [100, 100, 100, 100.5],
+        "K": [100, 95, 100.5, 101],
+        "T": [1, 1, 1, 0.5],
+        "r": [0, 0, 0.05, 0.05],
+        "sigma": [0.2, 0.2, 0.2, 0.25],
+        "option_type": ["Call", "Put", "Call", "Put"]
+    }).to_csv(input_path, index=False)
+
+    rows = price_file(str(input_path), str(output_path), chunk_size=2, workers=1)
+
+    priced = pd.read_parquet(output_path)
+    assert rows == 4
+    assert priced["K"].tolist() == [100, 95, 100.5, 101]
+    assert priced["S"].dtype == "float64"
+    assert priced["price"].notna().all()